@@ -0,0 +1,29 @@
+from .defuzz import (bisector, centroid, compensated_row_sums, compensated_sum, envelope,
+                     exact_bisector, exact_centroid, mom)
+from .cache import InferenceCache
+from .lut import LookupTable
+from .membership import NP_SHAPES, fuzzify, fuzzify_np, trap, trap_np, tri, tri_np
+from .system import EXACT_METHODS, METHODS, FuzzySystem
+
+__all__ = [
+    "EXACT_METHODS",
+    "FuzzySystem",
+    "InferenceCache",
+    "LookupTable",
+    "METHODS",
+    "NP_SHAPES",
+    "bisector",
+    "centroid",
+    "compensated_row_sums",
+    "compensated_sum",
+    "envelope",
+    "exact_bisector",
+    "exact_centroid",
+    "fuzzify",
+    "fuzzify_np",
+    "mom",
+    "trap",
+    "trap_np",
+    "tri",
+    "tri_np",
+]
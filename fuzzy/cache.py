@@ -0,0 +1,60 @@
+from collections import OrderedDict
+
+
+class InferenceCache:
+    # LRU cache keyed on quantized inputs.
+    #   resolution: numeric arguments are rounded to this step and the function
+    #               is evaluated at the rounded value (all inputs in one cell
+    #               get the same result)
+    #   version:    zero-argument callable; when its return value changes the
+    #               cache is cleared (e.g. membership-set parameters)
+
+    def __init__(self, func, resolution=0.1, maxsize=4096, version=None):
+        if resolution <= 0:
+            raise ValueError("resolution must be positive")
+        self.func = func
+        self.resolution = resolution
+        self.maxsize = maxsize
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._token = version() if version else None
+
+    def _quantize(self, args):
+        key, values = [], []
+        for a in args:
+            if isinstance(a, (int, float)) and not isinstance(a, bool):
+                k = round(a / self.resolution)
+                key.append(k)
+                values.append(k * self.resolution)
+            else:
+                key.append(a)
+                values.append(a)
+        return tuple(key), values
+
+    def __call__(self, *args):
+        if self.version is not None:
+            token = self.version()
+            if token != self._token:
+                self._data.clear()
+                self._token = token
+        key, values = self._quantize(args)
+        if key in self._data:
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+        self.misses += 1
+        result = self.func(*values)
+        self._data[key] = result
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return result
+
+    def clear(self):
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data),
+                "maxsize": self.maxsize, "resolution": self.resolution}
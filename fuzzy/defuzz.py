@@ -0,0 +1,115 @@
+import math
+
+import numpy as np
+
+# All functions work along the last axis: 1D (one output) or (rows, n_y)
+# arrays. Sums match the scalar code bit for bit: a `+=` loop -> np.cumsum
+# (sequential), the built-in sum() -> compensated_sum (Neumaier, as in
+# Python 3.12+).
+
+
+def compensated_row_sums(a):
+    total = np.zeros(a.shape[0])
+    comp = np.zeros(a.shape[0])
+    for x in a.T:
+        t = total + x
+        comp += np.where(np.abs(total) >= np.abs(x), (total - t) + x, (x - t) + total)
+        total = t
+    return np.where(comp != 0, total + comp, total)
+
+
+def compensated_sum(a):
+    if a.ndim == 1:
+        return np.float64(sum(a.tolist()))
+    return compensated_row_sums(a)
+
+
+def sequential_sum(a):
+    return np.cumsum(a, axis=-1)[..., -1]
+
+
+def centroid(y_values, agg, eps=1e-12, compensated=False):
+    total = compensated_sum if compensated else sequential_sum
+    den = total(agg)
+    num = total(y_values * agg)
+    ok = den > eps
+    return np.where(ok, num / np.where(ok, den, 1.0), 0.0)
+
+
+def mom(y_values, agg, tol=1e-9):
+    diff = np.abs(agg - agg.max(axis=-1, keepdims=True))
+    max_points = diff < tol if tol > 0 else diff == 0
+    return compensated_sum(np.where(max_points, y_values, 0.0)) / max_points.sum(axis=-1)
+
+
+def bisector(y_values, agg):
+    total = compensated_sum(agg)
+    reached = np.cumsum(agg, axis=-1) >= np.expand_dims(total / 2, -1)
+    found = (total != 0) & reached.any(axis=-1)
+    return np.where(found, y_values[np.argmax(reached, axis=-1)], 0.0)
+
+
+# ----------------- exact (piecewise-linear) defuzzification -----------------
+# tri/trap sets clipped at alpha levels and combined with max are piecewise
+# linear, so area, first moment and the half-area point are computed exactly
+# from the breakpoints (independent of y_step).
+
+def _interp(X, bx, by):
+    # X and bx increasing; bx covers the whole domain
+    out, k = [], 0
+    for x in X:
+        while k < len(bx) - 2 and bx[k + 1] < x:
+            k += 1
+        x0, x1 = bx[k], bx[k + 1]
+        out.append(by[k] + (by[k + 1] - by[k]) * (x - x0) / (x1 - x0) if x1 > x0 else by[k + 1])
+    return out
+
+
+def envelope(components):
+    # components: [(bx, by)] lists, bx increasing and covering the whole domain.
+    # Only tens of points, so plain Python beats NumPy here.
+    X = sorted({x for bx, _ in components for x in bx})
+    F = [_interp(X, bx, by) for bx, by in components]
+    extra = []
+    for i in range(len(F)):
+        for j in range(i + 1, len(F)):
+            fi, fj = F[i], F[j]
+            for k in range(len(X) - 1):
+                d0, d1 = fi[k] - fj[k], fi[k + 1] - fj[k + 1]
+                if d0 * d1 < 0:
+                    # crossing: the upper envelope switches lines here
+                    extra.append(X[k] + (X[k + 1] - X[k]) * d0 / (d0 - d1))
+    if extra:
+        X = sorted(set(X).union(extra))
+        F = [_interp(X, bx, by) for bx, by in components]
+    return X, [max(col) for col in zip(*F)]
+
+
+def exact_centroid(X, F):
+    area = moment = 0.0
+    for x0, x1, f0, f1 in zip(X, X[1:], F, F[1:]):
+        h = x1 - x0
+        area += (f0 + f1) * h / 2
+        moment += h * (x0 * (2 * f0 + f1) + x1 * (f0 + 2 * f1)) / 6
+    return moment / area if area > 0 else 0.0
+
+
+def exact_bisector(X, F):
+    areas = [(f0 + f1) * (x1 - x0) / 2 for x0, x1, f0, f1 in zip(X, X[1:], F, F[1:])]
+    half = sum(areas) / 2
+    if half <= 0:
+        return 0.0
+    acc = 0.0
+    for k, area in enumerate(areas):
+        if acc + area >= half:
+            break
+        acc += area
+    h = X[k + 1] - X[k]
+    rem, a = half - acc, F[k]
+    slope = (F[k + 1] - a) / h
+    # a*t + slope*t^2/2 = rem
+    if abs(slope) < 1e-12:
+        t = rem / a if a > 0 else 0.0
+    else:
+        t = (-a + math.sqrt(max(a * a + 2 * slope * rem, 0.0))) / slope
+    return X[k] + min(max(t, 0.0), h)
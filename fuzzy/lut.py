@@ -0,0 +1,211 @@
+import json
+import warnings
+from itertools import product
+from pathlib import Path
+
+import numpy as np
+
+
+class LookupTable:
+    # Dense regular-grid table for a bounded, deterministic f(x1..xd), queried
+    # by multilinear interpolation. Interpolation is only trustworthy where f is
+    # continuous inside a cell; build() flags cells where no rule fires (the
+    # output jumps to 0) or where the cell centre disagrees with exact inference
+    # by more than `tol`. Queries in flagged cells fall back to `exact` when it
+    # is attached (`exact_scalar` for single-point calls, which would otherwise
+    # pay the batch overhead), otherwise they are only counted in `flagged_fraction`.
+    # Errors are measured on random points and cell centres (an estimate, not a
+    # bound) twice: with the exact fallback and with plain interpolation, as a
+    # table loaded without `exact` answers. sampled_max_error / sampled_mean_error
+    # report the one that matches how this table answers.
+
+    def __init__(self, table, axes, flags=None, exact=None, sampled_errors=None, meta=None, exact_scalar=None):
+        self.table = table
+        self.axes = tuple((float(lo), float(hi), int(n)) for lo, hi, n in axes)
+        if len(self.axes) != table.ndim or any(n < 2 for _, _, n in self.axes):
+            raise ValueError("each table axis needs a (lo, hi, n>=2) entry")
+        self.flags = flags
+        self.exact = exact
+        self.exact_scalar = exact_scalar
+        self.sampled_errors = sampled_errors or {}  # {"exact" | "interpolated": {"max": .., "mean": ..}}
+        self.meta = meta or {}
+        self._lo = np.array([lo for lo, _, _ in self.axes])
+        self._hi = np.array([hi for _, hi, _ in self.axes])
+        self._step = np.array([(hi - lo) / (n - 1) for lo, hi, n in self.axes])
+        self._last = np.array([n - 2 for _, _, n in self.axes])
+        self._corners = list(product((0, 1), repeat=len(self.axes)))
+        # scalar path: plain floats/ints and flat offsets, no array allocation per call
+        self._scalar_axes = [(lo, hi, (hi - lo) / (n - 1), n - 2) for lo, hi, n in self.axes]
+        strides = [int(np.prod(table.shape[d + 1:])) for d in range(table.ndim)]
+        self._strides = strides
+        self._offsets = [0]
+        for stride in strides:
+            self._offsets = self._offsets + [o + stride for o in self._offsets]
+        self._flat = table.reshape(-1)
+
+    @property
+    def error_mode(self):
+        return "exact" if self.exact is not None and self.flags is not None else "interpolated"
+
+    @property
+    def sampled_max_error(self):
+        return self.sampled_errors.get(self.error_mode, {}).get("max")
+
+    @property
+    def sampled_mean_error(self):
+        return self.sampled_errors.get(self.error_mode, {}).get("mean")
+
+    @property
+    def flagged_fraction(self):
+        return float(self.flags.mean()) if self.flags is not None else 0.0
+
+    @classmethod
+    def build(cls, func, axes, coverage=None, tol=1.0, chunk_size=65536, dtype=np.float32, meta=None,
+              exact_scalar=None):
+        # func: takes columns (arrays), returns an array of outputs.
+        # coverage: optional columns -> strongest rule firing; 0 means no rule fires.
+        grids = [np.linspace(lo, hi, n) for lo, hi, n in axes]
+        shape = tuple(int(n) for _, _, n in axes)
+        table = np.empty(shape, dtype=dtype)
+        covered = np.ones(shape, dtype=bool)
+        for start, stop, cols in cls._points(grids, shape, chunk_size):
+            table.reshape(-1)[start:stop] = func(*cols)
+            if coverage is not None:
+                covered.reshape(-1)[start:stop] = coverage(*cols) > 0
+        lut = cls(table, axes, exact=func, meta=meta, exact_scalar=exact_scalar)
+
+        # A cell is flagged if rule coverage is mixed over its corners and centre
+        # (the output jumps to 0 inside it) or if its centre is badly interpolated.
+        # Cells with no coverage anywhere are constant 0 and interpolate exactly.
+        cells = tuple(n - 1 for n in shape)
+        any_cov = np.zeros(cells, dtype=bool)
+        all_cov = np.ones(cells, dtype=bool)
+        for corner in lut._corners:
+            c = covered[tuple(slice(k, k + n) for k, n in zip(corner, cells))]
+            any_cov |= c
+            all_cov &= c
+        flags = any_cov != all_cov
+        centres = [g[:-1] + (g[1:] - g[:-1]) / 2 for g in grids]
+        for start, stop, cols in cls._points(centres, cells, chunk_size):
+            bad = np.abs(lut._interpolate(cols) - func(*cols)) > tol
+            if coverage is not None:
+                cov = coverage(*cols) > 0
+                bad |= cov != all_cov.reshape(-1)[start:stop]
+            flags.reshape(-1)[start:stop] |= bad
+        lut.flags = flags
+        return lut
+
+    @staticmethod
+    def _points(grids, shape, chunk_size):
+        size = int(np.prod(shape))
+        for start in range(0, size, chunk_size):
+            stop = min(start + chunk_size, size)
+            idx = np.unravel_index(np.arange(start, stop), shape)
+            yield start, stop, [g[i] for g, i in zip(grids, idx)]
+
+    def _cell(self, xs):
+        idx, frac = [], []
+        for d, x in enumerate(xs):
+            pos = (np.clip(x, self._lo[d], self._hi[d]) - self._lo[d]) / self._step[d]
+            i0 = np.minimum(np.floor(pos).astype(np.intp), self._last[d])
+            idx.append(i0)
+            frac.append(pos - i0)
+        return idx, frac
+
+    def _interpolate(self, xs, cell=None):
+        idx, frac = cell or self._cell(xs)
+        out = np.zeros(np.shape(xs[0]))
+        for corner in self._corners:
+            w = np.ones(np.shape(xs[0]))
+            for c, f in zip(corner, frac):
+                w *= f if c else 1.0 - f
+            out += w * self.table[tuple(i + c for i, c in zip(idx, corner))]
+        return out
+
+    def _scalar(self, xs):
+        base, cell, weights = 0, 0, [1.0]
+        for x, (lo, hi, step, last), stride in zip(xs, self._scalar_axes, self._strides):
+            pos = (min(max(float(x), lo), hi) - lo) / step
+            i0 = min(int(pos), last)
+            f = pos - i0
+            base += i0 * stride
+            cell = cell * (last + 1) + i0
+            weights = [w * (1.0 - f) for w in weights] + [w * f for w in weights]
+        if self.flags is not None and self.flags.item(cell):
+            if self.exact_scalar is not None:
+                return float(self.exact_scalar(*(float(x) for x in xs)))
+            if self.exact is not None:
+                return float(self.exact(*(np.array([float(x)]) for x in xs))[0])
+        flat = self._flat
+        return sum(w * flat.item(base + o) for w, o in zip(weights, self._offsets) if w)
+
+    def __call__(self, *xs):
+        if len(xs) != len(self.axes):
+            raise ValueError(f"expected {len(self.axes)} inputs, got {len(xs)}")
+        if all(isinstance(x, (int, float, np.number)) or (isinstance(x, np.ndarray) and x.ndim == 0) for x in xs):
+            return self._scalar(xs)
+        xs = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in xs))
+        cell = self._cell(xs)
+        out = self._interpolate(xs, cell)
+        if self.exact is not None and self.flags is not None:
+            flagged = self.flags[tuple(cell[0])]
+            if flagged.any():
+                out[flagged] = self.exact(*(x[flagged] for x in xs))
+        return out
+
+    def measure_error(self, func=None, n_samples=20000, seed=0, chunk_size=65536):
+        # Random points plus random cell centres, compared with exact inference:
+        # once through __call__ (fallback in flagged cells, when `exact` is
+        # attached) and once interpolating everywhere.
+        func = func or self.exact
+        rng = np.random.default_rng(seed)
+        d = len(self.axes)
+        pts = self._lo + rng.random((n_samples, d)) * (self._hi - self._lo)
+        cells = rng.integers(0, self._last + 1, size=(n_samples, d))
+        mids = self._lo + (cells + 0.5) * self._step
+        pts = np.concatenate([pts, mids])
+        with_exact = self.exact is not None and self.flags is not None
+        modes = ("exact", "interpolated") if with_exact else ("interpolated",)
+        max_err, sum_err = dict.fromkeys(modes, 0.0), dict.fromkeys(modes, 0.0)
+        for start in range(0, len(pts), chunk_size):
+            chunk = pts[start:start + chunk_size].T
+            ref = func(*chunk)
+            for mode in modes:
+                err = np.abs((self(*chunk) if mode == "exact" else self._interpolate(chunk)) - ref)
+                max_err[mode] = max(max_err[mode], float(err.max()))
+                sum_err[mode] += float(err.sum())
+        for mode in modes:
+            self.sampled_errors[mode] = {"max": max_err[mode], "mean": sum_err[mode] / len(pts)}
+        return self.sampled_max_error
+
+    def save(self, path):
+        path = Path(path)
+        np.save(path.with_suffix(".npy"), self.table)
+        if self.flags is not None:
+            np.save(path.with_suffix(".flags.npy"), self.flags)
+        header = {
+            "axes": self.axes,
+            "sampled_errors": self.sampled_errors,
+            "flagged_fraction": self.flagged_fraction,
+            "meta": self.meta,
+        }
+        path.with_suffix(".json").write_text(json.dumps(header, indent=2))
+
+    @classmethod
+    def load(cls, path, exact=None, mmap=True, exact_scalar=None):
+        # exact / exact_scalar: the function the table was built from; without
+        # them flagged cells are interpolated across the jump, and the reported
+        # errors are the interpolation-only ones
+        path = Path(path)
+        header = json.loads(path.with_suffix(".json").read_text())
+        mode = "r" if mmap else None
+        table = np.load(path.with_suffix(".npy"), mmap_mode=mode)
+        flags_path = path.with_suffix(".flags.npy")
+        flags = np.load(flags_path, mmap_mode=mode) if flags_path.exists() else None
+        lut = cls(table, header["axes"], flags, exact, header.get("sampled_errors"), header.get("meta"), exact_scalar)
+        if exact is None and flags is not None and flags.any():
+            err = lut.sampled_max_error
+            warnings.warn(f"{path}: {lut.flagged_fraction:.1%} of cells are flagged but no exact function was "
+                          f"given; they are interpolated (sampled max error "
+                          f"{'unknown' if err is None else f'{err:.3g}'})", stacklevel=2)
+        return lut
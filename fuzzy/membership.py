@@ -0,0 +1,49 @@
+import numpy as np
+
+
+def tri(x, a, b, c):
+    if x <= a or x >= c:
+        return 0.0
+    if x < b:
+        return (x - a) / (b - a + 1e-12)
+    return (c - x) / (c - b + 1e-12)
+
+
+def trap(x, a, b, c, d):
+    if x <= a or x >= d:
+        return 0.0
+    if x < b:
+        return (x - a) / (b - a + 1e-12)
+    if x <= c:
+        return 1.0
+    return (d - x) / (d - c + 1e-12)
+
+
+def tri_np(x, a, b, c):
+    x = np.asarray(x, dtype=float)
+    up = (x - a) / (b - a + 1e-12)
+    down = (c - x) / (c - b + 1e-12)
+    return np.where((x <= a) | (x >= c), 0.0, np.where(x < b, up, down))
+
+
+def trap_np(x, a, b, c, d):
+    x = np.asarray(x, dtype=float)
+    up = (x - a) / (b - a + 1e-12)
+    down = (d - x) / (d - c + 1e-12)
+    return np.where((x <= a) | (x >= d), 0.0,
+                    np.where(x < b, up, np.where(x <= c, 1.0, down)))
+
+
+# Scalar shape -> vectorized counterpart. Shapes not listed are assumed to
+# accept arrays already.
+NP_SHAPES = {tri: tri_np, trap: trap_np}
+
+
+def fuzzify(terms, x):
+    # terms: {label: (shape, params)}
+    return {label: shape(x, *params) for label, (shape, params) in terms.items()}
+
+
+def fuzzify_np(terms, x):
+    return {label: NP_SHAPES.get(shape, shape)(x, *params)
+            for label, (shape, params) in terms.items()}
@@ -0,0 +1,243 @@
+from functools import reduce
+
+import numpy as np
+
+from . import defuzz
+from .membership import NP_SHAPES
+
+METHODS = ("centroid", "mom", "bisector")  # Mamdani defuzzifiers; "sugeno" is separate
+EXACT_METHODS = ("exact_centroid", "exact_bisector")
+
+
+class FuzzySystem:
+    # Declarative Mamdani system.
+    #   inputs: {var: {label: (shape, params)}}  (order matters)
+    #   output: {label: (shape, params)}
+    #   rules:  ((lbl_1, ..., lbl_n), out)          -- lesson-5 style, "a|b" = OR
+    #           {"ands": [(var, lbl)], "ors": [...], "out": lbl}  -- lesson-6 style
+    # Rules are compiled to integer indices once; the rule base is immutable,
+    # a new rule base needs a new system.
+
+    def __init__(self, inputs, output, rules, y_min=0, y_max=100, y_step=0.5,
+                 mom_tol=1e-9, centroid_eps=1e-12, compensated_centroid=False):
+        self.inputs = {var: dict(terms) for var, terms in inputs.items()}
+        self.input_names = tuple(self.inputs)
+        self.output = dict(output)
+        self.out_labels = tuple(self.output)
+        self.grid = (y_min, y_max, y_step)
+        self.options = dict(mom_tol=mom_tol, centroid_eps=centroid_eps,
+                            compensated_centroid=compensated_centroid)
+
+        self._labels = [tuple(terms) for terms in self.inputs.values()]
+        self._terms = [tuple(terms.values()) for terms in self.inputs.values()]
+        self._np_terms = [tuple((NP_SHAPES.get(shape, shape), params) for shape, params in terms)
+                          for terms in self._terms]
+
+        y = y_min + np.arange(int((y_max - y_min) / y_step) + 1) * y_step
+        out_sets = np.stack([NP_SHAPES.get(shape, shape)(y, *params)
+                             for shape, params in self.output.values()])
+        y.flags.writeable = False
+        out_sets.flags.writeable = False
+        self.y_values, self.out_sets = y, out_sets
+        # for exact defuzzification: breakpoints of each output set inside
+        # [y_min, y_max] (for tri/trap these are the parameters themselves)
+        self._out_breaks = []
+        for shape, params in self.output.values():
+            bx = np.array(sorted({float(y_min), float(y_max)} | {p for p in params if y_min < p < y_max}))
+            self._out_breaks.append((bx.tolist(), NP_SHAPES.get(shape, shape)(bx, *params).tolist()))
+
+        self.rules = tuple(rules)
+        self._rules = tuple(self._compile_rule(rule) for rule in self.rules)
+        self.set_consequents(None)
+
+    def set_consequents(self, consequents):
+        # Sugeno (TSK) consequents per output label:
+        #   number               -> zero order (z = c)
+        #   (c0, c1, ..., cn)    -> linear (z = c0 + c1*x1 + ... + cn*xn)
+        # Labels not given use the centroid of their output set.
+        centers = defuzz.centroid(self.y_values, self.out_sets)
+        consequents = {**dict(zip(self.out_labels, centers.tolist())), **(consequents or {})}
+        coeffs = np.zeros((len(self.out_labels), len(self.input_names) + 1))
+        for label, value in consequents.items():
+            if label not in self.out_labels:
+                raise ValueError(f"Unknown output label '{label}' (expected one of {self.out_labels})")
+            value = np.atleast_1d(np.asarray(value, dtype=float))
+            if value.shape[0] not in (1, coeffs.shape[1]):
+                raise ValueError(f"Consequent for '{label}' needs 1 or {coeffs.shape[1]} coefficients")
+            coeffs[self.out_labels.index(label), :value.shape[0]] = value
+        self.consequents = dict(consequents)
+        self._rule_coeffs = coeffs[[out_id for _, _, out_id in self._rules]]
+        self._rule_coeffs_py = [tuple(c) for c in self._rule_coeffs.tolist()]
+
+    # ----------------- compilation -----------------
+    def _antecedent(self, var, label):
+        if var not in self.inputs:
+            raise ValueError(f"Unknown variable '{var}' (expected one of {self.input_names})")
+        v = self.input_names.index(var)
+        ids = []
+        for part in label.split('|'):
+            part = part.strip()
+            if part not in self._labels[v]:
+                raise ValueError(f"Unknown label '{part}' for '{var}' (expected one of {self._labels[v]})")
+            ids.append(self._labels[v].index(part))
+        return v, tuple(ids)
+
+    def _compile_rule(self, rule):
+        if isinstance(rule, dict):
+            ands = tuple(self._antecedent(v, l) for v, l in rule.get("ands", []))
+            ors = tuple(self._antecedent(v, l) for v, l in rule.get("ors", []))
+            out = rule["out"]
+        else:
+            labels, out = rule
+            if len(labels) != len(self.input_names):
+                raise ValueError(f"Rule {rule!r} needs {len(self.input_names)} antecedents")
+            ands = tuple(self._antecedent(v, l) for v, l in zip(self.input_names, labels))
+            ors = ()
+        if out not in self.out_labels:
+            raise ValueError(f"Unknown output label '{out}' (expected one of {self.out_labels})")
+        return ands, ors, self.out_labels.index(out)
+
+    # ----------------- scalar path -----------------
+    def strengths(self, *xs):
+        mus = [[shape(x, *params) for shape, params in terms] for x, terms in zip(xs, self._terms)]
+        alphas = []
+        for ands, ors, _ in self._rules:
+            alpha_and = min(max(mus[v][i] for i in ids) for v, ids in ands) if ands else 1.0
+            alpha_or = max(max(mus[v][i] for i in ids) for v, ids in ors) if ors else 0.0
+            alphas.append(min(alpha_and, alpha_or) if (ands and ors) else max(alpha_and, alpha_or))
+        return alphas
+
+    def infer(self, *xs):
+        aggregated = np.zeros_like(self.y_values)
+        for alpha, (_, _, out_id) in zip(self.strengths(*xs), self._rules):
+            if alpha <= 0.0:
+                continue
+            np.maximum(aggregated, np.minimum(alpha, self.out_sets[out_id]), out=aggregated)
+        return self.y_values, aggregated
+
+    def sugeno(self, *xs):
+        # no output discretization: z = sum(w_r * z_r) / sum(w_r)
+        num = den = 0.0
+        for alpha, c in zip(self.strengths(*xs), self._rule_coeffs_py):
+            if alpha <= 0.0:
+                continue
+            z = c[0] + sum(ci * x for ci, x in zip(c[1:], xs))
+            num += alpha * z
+            den += alpha
+        return num / den if den > 0 else 0.0
+
+    def exact_envelope(self, *xs, strengths=None):
+        # exact shape of the aggregated output: breakpoints and their values
+        strengths = self.strengths(*xs) if strengths is None else strengths
+        alpha = [0.0] * len(self.out_labels)
+        for a, (_, _, out_id) in zip(strengths, self._rules):
+            alpha[out_id] = max(alpha[out_id], a)
+        components = []
+        for a, (bx, bv) in zip(alpha, self._out_breaks):
+            if a <= 0.0:
+                continue
+            px, py = [bx[0]], [min(a, bv[0])]
+            for x0, x1, v0, v1 in zip(bx, bx[1:], bv, bv[1:]):
+                if (v0 - a) * (v1 - a) < 0:
+                    px.append(x0 + (a - v0) / (v1 - v0) * (x1 - x0))
+                    py.append(a)
+                px.append(x1)
+                py.append(min(a, v1))
+            components.append((px, py))
+        if not components:
+            return list(map(float, self.grid[:2])), [0.0, 0.0]
+        return defuzz.envelope(components)
+
+    def evaluate(self, *xs, method="centroid"):
+        if method == "sugeno":
+            return float(self.sugeno(*xs))
+        if method in EXACT_METHODS:
+            return self.defuzzify(*self.exact_envelope(*xs), method)
+        y, mu = self.infer(*xs)
+        return float(self.defuzzify(y, mu, method))
+
+    # ----------------- batch (NumPy) path -----------------
+    def _columns(self, cols):
+        if len(cols) != len(self.input_names):
+            raise ValueError(f"expected {len(self.input_names)} input columns, got {len(cols)}")
+        return np.broadcast_arrays(*(np.asarray(c, dtype=float).ravel() for c in cols))
+
+    def fuzzify_batch(self, *cols):
+        # one (n_terms, rows) array per input
+        return [np.stack([shape(x, *params) for shape, params in terms])
+                for x, terms in zip(self._columns(cols), self._np_terms)]
+
+    def firing_strengths(self, *cols, mus=None):
+        # mus: precomputed fuzzify_batch output (e.g. so a parameter sweep does
+        # not recompute the terms it leaves unchanged)
+        mus = self.fuzzify_batch(*cols) if mus is None else mus
+        rows = mus[0].shape[1]
+
+        def term(v, ids):
+            return mus[v][ids[0]] if len(ids) == 1 else mus[v][list(ids)].max(axis=0)
+
+        strengths = np.empty((len(self._rules), rows))
+        for r, (ands, ors, _) in enumerate(self._rules):
+            alpha_and = reduce(np.minimum, (term(v, ids) for v, ids in ands)) if ands else np.ones(rows)
+            alpha_or = reduce(np.maximum, (term(v, ids) for v, ids in ors)) if ors else np.zeros(rows)
+            strengths[r] = np.minimum(alpha_and, alpha_or) if (ands and ors) else np.maximum(alpha_and, alpha_or)
+        return strengths
+
+    def aggregate(self, *cols):
+        return self.y_values, self._aggregate(self.firing_strengths(*cols))
+
+    def _aggregate(self, strengths):
+        aggregated = np.zeros((strengths.shape[1], self.y_values.shape[0]))
+        for alpha, (_, _, out_id) in zip(strengths, self._rules):
+            np.maximum(aggregated, np.minimum(alpha[:, None], self.out_sets[out_id]), out=aggregated)
+        return aggregated
+
+    def sugeno_batch(self, *cols, strengths=None):
+        cols = self._columns(cols)
+        w = self.firing_strengths(*cols) if strengths is None else strengths
+        z = self._rule_coeffs[:, :1] + self._rule_coeffs[:, 1:] @ np.stack(cols)
+        den = w.sum(axis=0)
+        return np.where(den > 0, (w * z).sum(axis=0) / np.where(den > 0, den, 1.0), 0.0)
+
+    def evaluate_all(self, *cols, methods=METHODS, chunk_size=4096, mus=None):
+        cols = self._columns(cols)
+        rows = cols[0].shape[0]
+        result = {m: np.empty(rows) for m in methods}
+        exact = [m for m in methods if m in EXACT_METHODS]
+        mamdani = [m for m in methods if m in METHODS]
+        for start in range(0, rows, chunk_size):
+            sl = slice(start, start + chunk_size)
+            chunk = [c[sl] for c in cols]
+            strengths = self.firing_strengths(*chunk, mus=None if mus is None else [m[:, sl] for m in mus])
+            if "sugeno" in methods:
+                result["sugeno"][sl] = self.sugeno_batch(*chunk, strengths=strengths)
+            if exact:
+                # the exact path is scalar: one envelope is built per row
+                for r, w in enumerate(strengths.T.tolist()):
+                    X, F = self.exact_envelope(strengths=w)
+                    for m in exact:
+                        result[m][start + r] = self.defuzzify(X, F, m)
+            if not mamdani:
+                continue
+            agg = self._aggregate(strengths)
+            for m in mamdani:
+                result[m][sl] = self.defuzzify(self.y_values, agg, m)
+        return result
+
+    def evaluate_batch(self, *cols, method="centroid", chunk_size=4096, mus=None):
+        return self.evaluate_all(*cols, methods=(method,), chunk_size=chunk_size, mus=mus)[method]
+
+    # ----------------- defuzzification -----------------
+    def defuzzify(self, y_values, agg, method):
+        if method == "centroid":
+            return defuzz.centroid(y_values, agg, self.options["centroid_eps"],
+                                   self.options["compensated_centroid"])
+        elif method == "mom":
+            return defuzz.mom(y_values, agg, self.options["mom_tol"])
+        elif method == "bisector":
+            return defuzz.bisector(y_values, agg)
+        elif method == "exact_centroid":
+            return defuzz.exact_centroid(y_values, agg)
+        elif method == "exact_bisector":
+            return defuzz.exact_bisector(y_values, agg)
+        raise ValueError(f"Unknown method '{method}'")
@@ -3,62 +3,59 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from tkinter.scrolledtext import ScrolledText
+from functools import lru_cache
+from itertools import islice
+import numpy as np
 import matplotlib
 matplotlib.use("TkAgg")
 
-# ----------------- Fuzzy logic code (original, slightly refactored) -----------------
+import os
+import sys
+# append, not prepend: the repo root has its own main.py, which would shadow this
+# module when spawn/forkserver workers re-import `main`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fuzzy import EXACT_METHODS, FuzzySystem, LookupTable, fuzzify, trap, tri
 
-def tri(x, a, b, c):
-    if x <= a or x >= c:
-        return 0.0
-    elif a < x < b:
-        return (x - a) / (b - a + 1e-12)
-    elif b <= x < c:
-        return (c - x) / (c - b + 1e-12)
-    else:
-        return 0.0
+# ----------------- Fuzzy logic code (original, slightly refactored) -----------------
 
-def trap(x, a, b, c, d):
-    if x <= a or x >= d:
-        return 0.0
-    elif a < x < b:
-        return (x - a) / (b - a + 1e-12)
-    elif b <= x <= c:
-        return 1.0
-    elif c < x < d:
-        return (d - x) / (d - c + 1e-12)
-    else:
-        return 0.0
+TEMPERATURE_TERMS = {
+    "cold":    (trap, (-10, 0, 10, 20)),
+    "warm":    (tri, (15, 25, 35)),
+    "hot":     (trap, (30, 35, 40, 45)),
+    "very_hot":(trap, (30, 35, 45, 55)),
+}
+
+HUMIDITY_TERMS = {
+    "dry":     (trap, (-10, 0, 20, 35)),
+    "normal":  (tri, (30, 50, 70)),
+    "humid":   (trap, (65, 80, 100, 110)),
+}
+
+AIR_QUALITY_TERMS = {
+    "good":    (trap, (-10, 0, 50, 75)),
+    "medium":  (tri, (50, 125, 200)),
+    "poor":    (trap, (175, 225, 300, 320)),
+}
+
+CONTROL_LEVEL_TERMS = {
+    "low":     (trap, (-10, 0, 30, 45)),
+    "medium":  (tri, (40, 55, 70)),
+    "high":    (tri, (65, 80, 90)),
+    "turbo":   (trap, (90, 95, 100, 110)),
+}
 
 def temperature_mu(x):
-    return {
-        "cold":    trap(x, -10, 0, 10, 20),
-        "warm":    tri(x, 15, 25, 35),
-        "hot":     trap(x, 30, 35, 40, 45),
-        "very_hot":trap(x, 30, 35, 45, 55),
-    }
+    return fuzzify(TEMPERATURE_TERMS, x)
 
 def humidity_mu(x):
-    return {
-        "dry":     trap(x, -10, 0, 20, 35),
-        "normal":  tri(x, 30, 50, 70),
-        "humid":   trap(x, 65, 80, 100, 110),
-    }
+    return fuzzify(HUMIDITY_TERMS, x)
 
 def air_quality_mu(x):
-    return {
-        "good":    trap(x, -10, 0, 50, 75),
-        "medium":  tri(x, 50, 125, 200),
-        "poor":    trap(x, 175, 225, 300, 320),
-    }
+    return fuzzify(AIR_QUALITY_TERMS, x)
 
 def control_level_sets():
-    return {
-        "low":       lambda y: trap(y, -10, 0, 30, 45),
-        "medium":    lambda y: tri(y, 40, 55, 70),
-        "high":      lambda y: tri(y, 65, 80, 90),
-        "turbo":     lambda y: trap(y, 90, 95, 100, 110),
-    }
+    return {label: (lambda y, shape=shape, params=params: shape(y, *params))
+            for label, (shape, params) in CONTROL_LEVEL_TERMS.items()}
 
 RULES = [
     (("cold", "humid"), "medium"),
@@ -119,28 +116,116 @@ def bisector(y_values, mu_values):
             return y
     return 0.0
 
-def decide_control_level(temp, hum, aqi, method="centroid"):
-    y, mu = mamdani(temp, hum, aqi)
-    if method == "centroid":
-        crisp = centroid(y, mu)
-    elif method == "mom":
-        crisp = mom(y, mu)
-    elif method == "bisector":
-        crisp = bisector(y, mu)
-    else:
-        raise ValueError(f"Unknown method '{method}'")
+# ----------------- NumPy engine (shared fuzzy package) -----------------
+# The scalar functions above stay as the reference ("python" engine); the fast
+# path goes through fuzzy.FuzzySystem and matches them bit for bit.
+
+@lru_cache(maxsize=32)
+def _compile(rules, grid):
+    inputs = {"temperature": TEMPERATURE_TERMS, "humidity": HUMIDITY_TERMS}
+    return FuzzySystem(inputs, CONTROL_LEVEL_TERMS, rules, *grid)
+
+def compile_rules(rules, y_min=0, y_max=100, y_step=0.5):
+    rules = tuple((tuple(ants), out) for ants, out in rules)
+    return _compile(rules, (y_min, y_max, y_step))
 
+_active_rules = compile_rules(RULES)
+
+def set_rules(rules):
+    # Hot-swap the rule base: compile first (on error the old base stays
+    # active), then replace the single reference.
+    global _active_rules, RULES
+    compiled = compile_rules(rules, *_active_rules.grid)
+    RULES = list(rules)  # so the scalar "python" engine sees the new base too
+    _active_rules = compiled
+    return compiled
+
+def grade_for(crisp):
     if crisp >= 85:
-        grade = "A"
+        return "A"
     elif crisp >= 70:
-        grade = "B"
+        return "B"
     elif crisp >= 55:
-        grade = "C"
+        return "C"
     elif crisp >= 40:
-        grade = "D"
+        return "D"
+    else:
+        return "F"
+
+DEFUZZIFIERS = {"centroid": centroid, "mom": mom, "bisector": bisector}
+
+def decide_control_level(temp, hum, aqi, method="centroid", engine="numpy"):
+    # exact_* methods do not depend on y_step; for them y, mu are the
+    # breakpoints of the exact aggregated shape
+    if method not in DEFUZZIFIERS and method not in EXACT_METHODS:
+        raise ValueError(f"Unknown method '{method}'")
+    if engine == "python":
+        if method not in DEFUZZIFIERS:
+            raise ValueError(f"Method '{method}' needs the numpy engine")
+        y, mu = mamdani(temp, hum, aqi)
+        crisp = DEFUZZIFIERS[method](y, mu)
+    elif engine == "numpy":
+        system = _active_rules
+        y, mu = system.exact_envelope(temp, hum) if method in EXACT_METHODS else system.infer(temp, hum)
+        crisp = float(system.defuzzify(y, mu, method))
     else:
-        grade = "F"
-    return crisp, grade, y, mu
+        raise ValueError(f"Unknown engine '{engine}'")
+    return crisp, grade_for(crisp), y, mu
+
+# ----------------- Batch / streaming API -----------------
+
+GRADE_THRESHOLDS = [(85, "A"), (70, "B"), (55, "C"), (40, "D")]
+
+def grades_for(crisp):
+    crisp = np.asarray(crisp)
+    return np.select([crisp >= t for t, _ in GRADE_THRESHOLDS],
+                     [g for _, g in GRADE_THRESHOLDS], default="F")
+
+def decide_control_level_batch(temps, hums, aqis=None, chunk_size=4096, rules=None):
+    # aqi is not used by the rules yet (same as the scalar version)
+    temps = np.asarray(temps, dtype=float).ravel()
+    hums = np.asarray(hums, dtype=float).ravel()
+    if temps.shape != hums.shape:
+        raise ValueError("temps and hums must have the same length")
+    result = (rules or _active_rules).evaluate_all(temps, hums, chunk_size=chunk_size)
+    result["grade"] = grades_for(result["centroid"])
+    return result
+
+def stream_control_levels(rows, chunk_size=65536):
+    # rows: iterable of (temp, hum, aqi), e.g. a csv.reader (no header)
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        data = np.array(chunk, dtype=float).reshape(len(chunk), -1)
+        result = decide_control_level_batch(data[:, 0], data[:, 1], data[:, 2])
+        result["temp"], result["hum"], result["aqi"] = data[:, 0], data[:, 1], data[:, 2]
+        yield result
+
+# ----------------- Lookup-table (LUT) surrogate -----------------
+# aqi is not used by the rules, so the table is 2-D (temp, hum).
+# 0.25 step: 281 x 481 float32 ~ 0.5 MB.
+
+LUT_AXES = ((-10, 60, 281), (-10, 110, 481))
+
+def build_control_lut(method="centroid", axes=LUT_AXES, n_samples=20000, tol=1.0):
+    # Cells where no rule fires or interpolation misses a jump by more than tol
+    # are answered by exact inference with the rule base active at build time.
+    if method not in ("centroid", "mom", "bisector"):
+        raise ValueError(f"Unknown method '{method}'")
+    rules = _active_rules
+    exact = lambda t, h: decide_control_level_batch(t, h, rules=rules)[method]
+    exact_scalar = lambda t, h: rules.evaluate(t, h, method=method)
+    coverage = lambda t, h: rules.firing_strengths(t, h).max(axis=0)
+    lut = LookupTable.build(exact, axes, coverage=coverage, tol=tol, meta={"method": method},
+                            exact_scalar=exact_scalar)
+    lut.measure_error(n_samples=n_samples)
+    return lut
+
+def decide_control_level_lut(temp, hum, aqi, lut):
+    crisp = lut(temp, hum)
+    return crisp, grade_for(crisp)
 
 def run_tests_collect():
     test_cases = [
@@ -155,12 +240,12 @@ def run_tests_collect():
         (55, 30, 180),
         (50, 70, 250),
     ]
+    t, h, aqi = zip(*test_cases)
+    res = decide_control_level_batch(t, h, aqi)
     rows = []
     for i, (t, h, aqi) in enumerate(test_cases):
-        c1, g1, _, _ = decide_control_level(t, h, aqi, "centroid")
-        c2, _, _, _ = decide_control_level(t, h, aqi, "mom")
-        c3, _, _, _ = decide_control_level(t, h, aqi, "bisector")
-        rows.append((i+1, t, h, aqi, round(c1,2), round(c2,2), round(c3,2), g1))
+        c1, c2, c3 = (float(res[k][i]) for k in ("centroid", "mom", "bisector"))
+        rows.append((i+1, t, h, aqi, round(c1,2), round(c2,2), round(c3,2), str(res["grade"][i])))
     return rows
 
 # ----------------- Tkinter GUI -----------------
@@ -204,7 +289,7 @@ class FuzzyGUI(tk.Tk):
 
         ttk.Label(left, text="Defuzzifikatsiya usuli").pack(anchor=tk.W, pady=(8,0))
         self.method_var = tk.StringVar(value="centroid")
-        self.method_cb = ttk.Combobox(left, textvariable=self.method_var, values=["centroid","mom","bisector"], state="readonly")
+        self.method_cb = ttk.Combobox(left, textvariable=self.method_var, values=["centroid","mom","bisector","exact_centroid","exact_bisector"], state="readonly")
         self.method_cb.pack(fill=tk.X, pady=(0,8))
 
         # Buttons
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# Headless bulk grading: python lesson-6/bulk.py cohort.csv -o graded.csv
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+
+import numpy as np
+
+from main import INTERPRETATION, METHODS, SHIFTS, evaluate_batch, make_rating_system, score_to_category
+
+INPUT_COLUMNS = ("attendance", "exam", "project", "lab")
+POOL_THRESHOLD = 16 * 1024 * 1024  # files larger than this use a process pool
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        sys.exit("Parquet support needs pyarrow (pip install pyarrow)")
+    return pa, pq
+
+
+# ----------------- readers / writers -----------------
+def read_csv_chunks(path, chunk_size):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if not rows:
+                return
+            yield {name: [r[name] for r in rows] for name in reader.fieldnames}
+
+
+def read_parquet_chunks(path, chunk_size):
+    _, pq = _pyarrow()
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pydict()
+
+
+def write_csv(path, chunks):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = None
+        for cols in chunks:
+            if writer is None:
+                writer = csv.writer(f)
+                writer.writerow(cols)
+            writer.writerows(zip(*cols.values()))
+
+
+def write_parquet(path, chunks):
+    pa, pq = _pyarrow()
+    writer = None
+    try:
+        for cols in chunks:
+            table = pa.table(cols)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def is_parquet(path):
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+# ----------------- grading -----------------
+@lru_cache(maxsize=8)
+def _system(shifts):
+    return make_rating_system(*shifts)
+
+
+def grade_columns(inputs, method, shifts):
+    # also called in pool workers: only the 4 float columns are sent
+    scores, _ = evaluate_batch(*inputs, method, system=_system(shifts))
+    return scores
+
+
+def grade_chunks(chunks, method, shifts, workers):
+    def inputs(cols):
+        missing = [c for c in INPUT_COLUMNS if c not in cols]
+        if missing:
+            sys.exit(f"Missing input columns: {', '.join(missing)}")
+        return [np.asarray(cols[c], dtype=float) for c in INPUT_COLUMNS]
+
+    if workers <= 1:
+        for cols in chunks:
+            yield cols, grade_columns(inputs(cols), method, shifts)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for cols in chunks:
+            pending.append((cols, pool.submit(grade_columns, inputs(cols), method, shifts)))
+            if len(pending) >= 2 * workers:  # keep memory bounded
+                cols, fut = pending.popleft()
+                yield cols, fut.result()
+        while pending:
+            cols, fut = pending.popleft()
+            yield cols, fut.result()
+
+
+def annotate(graded, lang, stats):
+    texts = INTERPRETATION[lang]
+    for cols, scores in graded:
+        scores = scores.tolist()
+        cats = [score_to_category(s) for s in scores]  # as in evaluate(): before rounding
+        cols = dict(cols)
+        cols["score"] = [round(s, 2) for s in scores]
+        cols["category"] = cats
+        cols["interpretation"] = [texts[c] for c in cats]
+        stats["rows"] += len(scores)
+        yield cols
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Grade a student cohort with the lesson-6 fuzzy rating system.")
+    ap.add_argument("input", help="cohort file (.csv or .parquet) with columns " + ", ".join(INPUT_COLUMNS))
+    ap.add_argument("-o", "--output", required=True, help="output file (.csv or .parquet)")
+    ap.add_argument("--method", default="Centroid", choices=list(METHODS))
+    ap.add_argument("--lang", default="en", choices=list(INTERPRETATION))
+    ap.add_argument("--shifts", type=float, nargs=3, default=SHIFTS, metavar=("ATT", "EXAM", "PROJ"),
+                    help="make_new_mus shifts (default: %(default)s)")
+    ap.add_argument("--chunk-size", type=int, default=50000)
+    ap.add_argument("--workers", type=int, default=0,
+                    help="process pool size; 0 = auto (pool only for files over 16 MB)")
+    args = ap.parse_args(argv)
+
+    workers = args.workers
+    if workers <= 0:
+        workers = (os.cpu_count() or 1) if os.path.getsize(args.input) > POOL_THRESHOLD else 1
+
+    read = read_parquet_chunks if is_parquet(args.input) else read_csv_chunks
+    write = write_parquet if is_parquet(args.output) else write_csv
+    stats = {"rows": 0}
+
+    t0 = time.perf_counter()
+    graded = grade_chunks(read(args.input, args.chunk_size), args.method, tuple(args.shifts), workers)
+    write(args.output, annotate(graded, args.lang, stats))
+    elapsed = time.perf_counter() - t0
+
+    rate = stats["rows"] / elapsed if elapsed > 0 else 0.0
+    print(f"{stats['rows']} rows in {elapsed:.2f}s ({rate:,.0f} rows/s, workers={workers}, method={args.method})",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,51 @@
+import os
+import sys
+import time
 import tkinter as tk
 from tkinter import ttk
 import numpy as np
 
-def tri(x,a,b,c):
-    if x<=a or x>=c: return 0.0
-    if x<b: return (x-a)/(b-a+1e-12)
-    return (c-x)/(c-b+1e-12)
+# append, not prepend: the repo root has its own main.py, which would shadow this
+# module when spawn/forkserver pool workers re-import `main` (bulk.py, sweep.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fuzzy import FuzzySystem, InferenceCache, LookupTable, fuzzify, trap, tri
 
-def trap(x,a,b,c,d):
-    if x<=a or x>=d: return 0.0
-    if x<b: return (x-a)/(b-a+1e-12)
-    if x<=c: return 1.0
-    return (d-x)/(d-c+1e-12)
+LAB_TERMS = {"weak":(trap,(-5,0,35,50)),"avg":(tri,(40,55,70)),"strong":(trap,(65,80,100,110))}
+
+def make_new_terms(att_shift=80, exam_shift=80, proj_shift=75):
+    return {
+        "attendance": {"low":(trap,(-10,0,40,55)),"mid":(tri,(45,60,75)),"high":(trap,(att_shift,att_shift+5,100,120))},
+        "exam": {"weak":(trap,(-10,0,40,55)),"avg":(tri,(45,60,75)),"strong":(trap,(exam_shift,exam_shift+5,100,120))},
+        "project": {"poor":(trap,(-10,0,40,55)),"good":(tri,(50,65,80)),"excellent":(trap,(proj_shift,proj_shift+10,100,120))},
+        "lab": LAB_TERMS,
+    }
+
+RATING_TERMS = {
+    "low": (trap,(-10,0,35,50)),
+    "fair": (tri,(45,55,65)),
+    "good": (tri,(60,72,84)),
+    "excellent": (trap,(80,88,100,110)),
+    "very_excellent": (trap,(90,95,100,110)),
+}
 
 def make_new_mus(att_shift=80, exam_shift=80, proj_shift=75):
+    terms = make_new_terms(att_shift, exam_shift, proj_shift)
     def attendance_mu(x):
-        return {"low":trap(x,-10,0,40,55),"mid":tri(x,45,60,75),"high":trap(x,att_shift,att_shift+5,100,120)}
+        return fuzzify(terms["attendance"], x)
     def exam_mu(x):
-        return {"weak":trap(x,-10,0,40,55),"avg":tri(x,45,60,75),"strong":trap(x,exam_shift,exam_shift+5,100,120)}
+        return fuzzify(terms["exam"], x)
     def project_mu(x):
-        return {"poor":trap(x,-10,0,40,55),"good":tri(x,50,65,80),"excellent":trap(x,proj_shift,proj_shift+10,100,120)}
+        return fuzzify(terms["project"], x)
     return attendance_mu, exam_mu, project_mu
 
 attendance_mu, exam_mu, project_mu = make_new_mus()
 
 def lab_mu(x):
-    return {"weak":trap(x,-5,0,35,50),"avg":tri(x,40,55,70),"strong":trap(x,65,80,100,110)}
+    return fuzzify(LAB_TERMS, x)
 
 def rating_sets():
-    return {
-        "low": lambda y: trap(y,-10,0,35,50),
-        "fair": lambda y: tri(y,45,55,65),
-        "good": lambda y: tri(y,60,72,84),
-        "excellent": lambda y: trap(y,80,88,100,110),
-        "very_excellent": lambda y: trap(y,90,95,100,110),
-    }
+    return {label: (lambda y, shape=shape, params=params: shape(y,*params))
+            for label,(shape,params) in RATING_TERMS.items()}
 
 RULES_NEW = [
     {"ands":[("attendance","high"),("exam","strong"),("project","excellent"),("lab","strong")],"ors":[],"out":"very_excellent"},
@@ -100,11 +111,120 @@ def score_to_category(score):
     return "Low"
 
 def evaluate(att,ex,proj,lab,method):
-    y,mu = mamdani_new(att,ex,proj,lab)
-    score = defuzzify(y,mu,method)
+    score = SYSTEM.evaluate(att,ex,proj,lab, method=METHODS[method]) if method in METHODS else 0.0
     cat = score_to_category(score)
     return round(score,2), cat
 
+def make_evaluation_cache(resolution=0.1, maxsize=4096):
+    # key: quantized (attendance, exam, project, lab, method)
+    return InferenceCache(evaluate, resolution=resolution, maxsize=maxsize, version=lambda: SHIFTS)
+
+# ----------------- Shared fuzzy engine -----------------
+# mamdani_new/defuzzify above stay as the reference; evaluate and the batch
+# paths go through fuzzy.FuzzySystem (lesson-6 semantics: Centroid with the
+# compensated sum(), MoM with exact equality).
+
+METHODS = {"Centroid": "centroid", "Mean of Maxima (MoM)": "mom", "Bisector": "bisector",
+           "Exact Centroid": "exact_centroid", "Exact Bisector": "exact_bisector",
+           "Sugeno (TSK)": "sugeno"}
+
+def make_rating_system(att_shift=80, exam_shift=80, proj_shift=75):
+    return FuzzySystem(make_new_terms(att_shift, exam_shift, proj_shift), RATING_TERMS, RULES_NEW,
+                       mom_tol=0.0, centroid_eps=0.0, compensated_centroid=True)
+
+SHIFTS = (80, 80, 75)
+SYSTEM = make_rating_system(*SHIFTS)
+
+def set_shifts(att_shift=80, exam_shift=80, proj_shift=75):
+    # shift the "high/strong/excellent" sets; SHIFTS changes, so caches from
+    # make_evaluation_cache clear themselves
+    global SHIFTS, SYSTEM, attendance_mu, exam_mu, project_mu
+    system = make_rating_system(att_shift, exam_shift, proj_shift)
+    attendance_mu, exam_mu, project_mu = make_new_mus(att_shift, exam_shift, proj_shift)
+    SYSTEM = system
+    SHIFTS = (att_shift, exam_shift, proj_shift)
+
+def mamdani_new_batch(att,ex,proj,lab,system=None):
+    return (system or SYSTEM).aggregate(att,ex,proj,lab)
+
+def score_to_category_batch(scores):
+    return np.select([scores>=90, scores>=80, scores>=70, scores>=55],
+                     ["Very Excellent","Excellent","Good","Fair"], default="Low")
+
+def evaluate_batch(att,ex,proj,lab,method,chunk_size=4096,system=None):
+    if method in METHODS:
+        scores = (system or SYSTEM).evaluate_batch(att,ex,proj,lab, method=METHODS[method], chunk_size=chunk_size)
+    else:
+        scores = np.zeros(np.broadcast(*(np.asarray(v).ravel() for v in (att,ex,proj,lab))).shape)
+    return scores, score_to_category_batch(scores)
+
+# ----------------- Sugeno vs Centroid report -----------------
+# Sugeno (zero-order TSK): consequents are the rating_sets() centres and the score
+# is the firing-strength weighted mean -- no 201-point output grid.
+
+def sugeno_report(step=10, system=None):
+    system = system or SYSTEM
+    axis = np.arange(0, 100+step, step, dtype=float)
+    cols = [c.ravel() for c in np.meshgrid(axis, axis, axis, axis, indexing="ij")]
+    points = list(zip(*(c.tolist() for c in cols)))
+
+    timings = {}
+    for method in ("centroid", "sugeno"):
+        t0 = time.perf_counter()
+        scalar = np.array([system.evaluate(*p, method=method) for p in points])
+        t1 = time.perf_counter()
+        batch = system.evaluate_batch(*cols, method=method)
+        t2 = time.perf_counter()
+        timings[method] = (scalar, t1-t0, t2-t1)
+
+    centroid, sugeno = timings["centroid"][0], timings["sugeno"][0]
+    dev = np.abs(sugeno - centroid)
+    return {
+        "points": len(points),
+        "centroid_scalar_s": timings["centroid"][1],
+        "sugeno_scalar_s": timings["sugeno"][1],
+        "centroid_batch_s": timings["centroid"][2],
+        "sugeno_batch_s": timings["sugeno"][2],
+        "scalar_speedup": timings["centroid"][1] / timings["sugeno"][1],
+        "batch_speedup": timings["centroid"][2] / timings["sugeno"][2],
+        "max_dev": float(dev.max()),
+        "mean_dev": float(dev.mean()),
+        "category_agreement": float(np.mean(score_to_category_batch(sugeno) == score_to_category_batch(centroid))),
+    }
+
+def format_sugeno_report(r):
+    return "\n".join([
+        f"Grid points:          {r['points']}",
+        f"Scalar  Centroid:     {r['centroid_scalar_s']*1e6/r['points']:8.2f} us/eval",
+        f"Scalar  Sugeno:       {r['sugeno_scalar_s']*1e6/r['points']:8.2f} us/eval  (x{r['scalar_speedup']:.1f})",
+        f"Batch   Centroid:     {r['centroid_batch_s']*1e6/r['points']:8.2f} us/eval",
+        f"Batch   Sugeno:       {r['sugeno_batch_s']*1e6/r['points']:8.2f} us/eval  (x{r['batch_speedup']:.1f})",
+        f"|Sugeno - Centroid|:  max {r['max_dev']:.2f}, mean {r['mean_dev']:.2f}",
+        f"Same category:        {r['category_agreement']*100:.1f}%",
+    ])
+
+# ----------------- Lookup-table (LUT) surrogate -----------------
+# 4-D (att, exam, project, lab) grid over 0..100 in 2.5 steps:
+# 41^4 float32 ~ 11 MB.
+
+RATING_LUT_AXES = ((0,100,41),) * 4
+
+def build_rating_lut(method="Centroid", axes=RATING_LUT_AXES, n_samples=20000, tol=1.0):
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}'")
+    system = SYSTEM
+    exact = lambda *cols: evaluate_batch(*cols, method, system=system)[0]
+    exact_scalar = lambda *xs: system.evaluate(*xs, method=METHODS[method])
+    coverage = lambda *cols: system.firing_strengths(*cols).max(axis=0)
+    lut = LookupTable.build(exact, axes, coverage=coverage, tol=tol, meta={"method": method, "shifts": SHIFTS},
+                            exact_scalar=exact_scalar)
+    lut.measure_error(n_samples=n_samples)
+    return lut
+
+def evaluate_lut(att,ex,proj,lab,lut):
+    score = lut(att,ex,proj,lab)
+    return round(score,2), score_to_category(score)
+
 INTERPRETATION = {
     "en": {
         "Very Excellent": "Outstanding! The student demonstrates excellent consistency, participation, and mastery.",
@@ -124,8 +244,9 @@ INTERPRETATION = {
 
 
 class FuzzyGUI(tk.Tk):
-    def __init__(self):
+    def __init__(self, cache_resolution=0.1, cache_size=4096):
         super().__init__()
+        self.cache = make_evaluation_cache(cache_resolution, cache_size)
         self.title("🎓 Intelligent Student Rating System")
         self.geometry("950x750")
         self.configure(bg="#f9fafb")
@@ -161,7 +282,7 @@ class FuzzyGUI(tk.Tk):
 
             if name == "Lab":
                 ttk.Label(left, text="Defuzzification method:", font=("Segoe UI", 10, "bold")).pack(anchor="w", pady=(5,0))
-                ttk.Combobox(left, textvariable=self.method, values=["Centroid", "Mean of Maxima (MoM)", "Bisector"], state="readonly").pack(fill="x", pady=(0,10))
+                ttk.Combobox(left, textvariable=self.method, values=list(METHODS), state="readonly").pack(fill="x", pady=(0,10))
 
         right = ttk.LabelFrame(main_frame, text="Results", padding=10)
         right.pack(side="left", fill="both", expand=True)
@@ -181,6 +302,8 @@ class FuzzyGUI(tk.Tk):
         ttk.Label(control, text="Language:").pack(side="right", padx=(0,5))
         ttk.Combobox(control, textvariable=self.lang, values=["en", "uz"], width=5, state="readonly").pack(side="right", padx=5)
         self.lang.trace_add("write", lambda *_: self.on_evaluate())
+        self.cache_lbl = ttk.Label(control, text="")
+        self.cache_lbl.pack(side="right", padx=10)
 
         self.on_evaluate()
 
@@ -190,8 +313,9 @@ class FuzzyGUI(tk.Tk):
         proj= self.vars["project"].get()
         lab = self.vars["lab"].get()
         method = self.method.get()
-        score, cat = evaluate(att,ex,proj,lab,method)
+        score, cat = self.cache(att,ex,proj,lab,method)
         lang = self.lang.get()
+        self.cache_lbl.config(text=f"Cache: {self.cache.hits} hits / {self.cache.misses} misses")
 
         self.text.delete("1.0","end")
         self.text.insert("end", f"📊 Input values:\n")
@@ -217,4 +341,7 @@ class FuzzyGUI(tk.Tk):
 
 
 if __name__ == "__main__":
-    FuzzyGUI().mainloop()
+    if "--sugeno-report" in sys.argv:
+        print(format_sugeno_report(sugeno_report()))
+    else:
+        FuzzyGUI().mainloop()
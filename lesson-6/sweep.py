@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# make_new_mus shift sweep: python lesson-6/sweep.py cohort.csv --att 70:90:5 --exam 70:90:5
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+
+from bulk import INPUT_COLUMNS, read_csv_chunks
+from main import METHODS, SHIFTS, make_new_terms, make_rating_system, score_to_category_batch
+from fuzzy import NP_SHAPES  # importable once main.py has appended the repo root to sys.path
+
+CATEGORIES = ("Very Excellent", "Excellent", "Good", "Fair", "Low")
+# each shift moves only one term; the other terms are computed once
+SHIFTED_TERMS = (("attendance", "high"), ("exam", "strong"), ("project", "excellent"))
+
+_state = {}
+
+
+def _init(cols, method):
+    # once per worker process: the cohort and the unchanged membership degrees
+    system = make_rating_system(*SHIFTS)
+    _state.update(cols=cols, method=METHODS[method], system=system,
+                  mus=system.fuzzify_batch(*cols), columns={})
+
+
+def _term_column(k, value):
+    # column for a shifted term; cached per value (a+e+p evaluations, not a*e*p)
+    key = (k, value)
+    if key not in _state["columns"]:
+        var, label = SHIFTED_TERMS[k]
+        shifts = list(SHIFTS)
+        shifts[k] = value
+        shape, params = make_new_terms(*shifts)[var][label]
+        v = _state["system"].input_names.index(var)
+        _state["columns"][key] = NP_SHAPES.get(shape, shape)(_state["cols"][v], *params)
+    return _state["columns"][key]
+
+
+def evaluate_setting(setting):
+    system = _state["system"]
+    mus = list(_state["mus"])
+    for k, value in enumerate(setting):
+        var, label = SHIFTED_TERMS[k]
+        v = system.input_names.index(var)
+        mus[v] = mus[v].copy()
+        mus[v][list(system.inputs[var]).index(label)] = _term_column(k, value)
+    scores = system.evaluate_batch(*_state["cols"], method=_state["method"], mus=mus)
+    cats = score_to_category_batch(scores)
+    shares = [float(np.mean(cats == c)) for c in CATEGORIES]
+    return (*setting, float(scores.mean()), *shares)
+
+
+def sweep(cols, settings, method="Centroid", workers=1):
+    cols = [np.asarray(c, dtype=float) for c in cols]
+    if workers <= 1:
+        _init(cols, method)
+        return [evaluate_setting(s) for s in settings]
+    with ProcessPoolExecutor(workers, initializer=_init, initargs=(cols, method)) as pool:
+        return list(pool.map(evaluate_setting, settings, chunksize=max(1, len(settings) // (4 * workers))))
+
+
+def parse_values(spec, default):
+    # "70:90:5" (end inclusive), "70,75,80" or a single number
+    if spec is None:
+        return [default]
+    if ":" in spec:
+        start, stop, step = (float(x) for x in spec.split(":"))
+        return [start + i * step for i in range(int(round((stop - start) / step)) + 1)]
+    return [float(x) for x in spec.split(",")]
+
+
+def load_cohort(path):
+    cols = {c: [] for c in INPUT_COLUMNS}
+    for chunk in read_csv_chunks(path, 100000):
+        for c in INPUT_COLUMNS:
+            cols[c].extend(chunk[c])
+    return [np.asarray(cols[c], dtype=float) for c in INPUT_COLUMNS]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Category sensitivity of the lesson-6 rating to make_new_mus shifts.")
+    ap.add_argument("cohort", nargs="?", help="reference cohort CSV (columns " + ", ".join(INPUT_COLUMNS) + ")")
+    ap.add_argument("--synthetic", type=int, metavar="N", help="use N uniform random students instead of a file")
+    ap.add_argument("--att", help="attendance shifts, e.g. 70:90:5 or 75,80,85")
+    ap.add_argument("--exam", help="exam shifts")
+    ap.add_argument("--proj", help="project shifts")
+    ap.add_argument("--method", default="Centroid", choices=list(METHODS))
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("-o", "--output", help="write the table as CSV (default: print)")
+    args = ap.parse_args(argv)
+
+    if args.synthetic:
+        cols = list(np.random.default_rng(0).uniform(0, 100, (4, args.synthetic)))
+    elif args.cohort:
+        cols = load_cohort(args.cohort)
+    else:
+        ap.error("give a cohort file or --synthetic N")
+
+    settings = list(product(parse_values(args.att, SHIFTS[0]),
+                            parse_values(args.exam, SHIFTS[1]),
+                            parse_values(args.proj, SHIFTS[2])))
+    t0 = time.perf_counter()
+    table = sweep(cols, settings, args.method, args.workers)
+    elapsed = time.perf_counter() - t0
+
+    header = ("att_shift", "exam_shift", "proj_shift", "mean_score", *CATEGORIES)
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(header)
+            w.writerows(table)
+    else:
+        print(" | ".join(f"{h:>14}" for h in header))
+        for row in table:
+            print(" | ".join(f"{x:14.2f}" if i < 4 else f"{x * 100:13.1f}%" for i, x in enumerate(row)))
+    print(f"{len(settings)} settings x {len(cols[0])} students in {elapsed:.2f}s "
+          f"({len(settings) * len(cols[0]) / elapsed:,.0f} evaluations/s, workers={args.workers})",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
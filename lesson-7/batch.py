@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# Headless Schelling experiments:
+#   python lesson-7/batch.py --size 50 --th-a 0.3:0.7:0.05 --th-b 0.3:0.7:0.05 --replicates 20 -o runs.npz
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+
+from main import Simulation
+
+CONFIG_COLUMNS = ("run", "size", "share_A", "share_B", "share_C", "th_A", "th_B", "th_C", "neighborhood",
+                  "move_strategy", "radius", "seed")
+STEP_COLUMNS = ("step", "moves", "dissatisfied", "mean_similarity", "segregation")
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        sys.exit("Parquet support needs pyarrow (pip install pyarrow)")
+    return pa, pq
+
+
+# ----------------- runs -----------------
+def run_config(config, max_steps=200, backend="numpy", incremental=False):
+    # one configuration: until it settles (moves == 0) or max_steps
+    params = {k: v for k, v in config.items() if k != "run"}
+    sim = Simulation(max_steps=max_steps, backend=backend, incremental=incremental, **params)
+    moves = []
+    while sim.step_count < max_steps:
+        moved = sim.step()[0]
+        moves.append(moved)
+        if moved == 0:
+            break
+    steps = len(sim.history)
+    cols = {k: [config[k]] * steps for k in CONFIG_COLUMNS}
+    cols["step"] = [h[0] for h in sim.history]
+    cols["moves"] = moves
+    cols["dissatisfied"] = [h[1] for h in sim.history]
+    cols["mean_similarity"] = [h[2] for h in sim.history]
+    cols["segregation"] = [h[3] for h in sim.history]
+    return cols
+
+
+def _run(args):
+    return run_config(*args)
+
+
+def run_all(configs, max_steps=200, backend="numpy", incremental=False, workers=1):
+    jobs = [(c, max_steps, backend, incremental) for c in configs]
+    if workers <= 1:
+        yield from map(_run, jobs)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        yield from pool.map(_run, jobs, chunksize=max(1, len(jobs) // (8 * workers)))
+
+
+def make_configs(sizes, shares_A, shares_B, shares_C, ths_A, ths_B, ths_C, neighborhoods, replicates, seed=0,
+                 strategies=("random",), radii=(0,)):
+    grid = product(sizes, shares_A, shares_B, shares_C, ths_A, ths_B, ths_C, neighborhoods, strategies, radii,
+                   range(replicates))
+    return [dict(zip(CONFIG_COLUMNS, (run, *values[:-1], seed + values[-1])))
+            for run, values in enumerate(grid)]
+
+
+# ----------------- writers -----------------
+def _batches(results, rows_per_batch=200000):
+    # collects results by column and hands them out in large chunks
+    batch, rows = None, 0
+    for cols in results:
+        if batch is None:
+            batch = {k: [] for k in cols}
+        for k, v in cols.items():
+            batch[k].extend(v)
+        rows += len(cols["step"])
+        if rows >= rows_per_batch:
+            yield batch
+            batch, rows = None, 0
+    if batch is not None:
+        yield batch
+
+
+def write_csv(path, results):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CONFIG_COLUMNS + STEP_COLUMNS)
+        for cols in _batches(results):
+            writer.writerows(zip(*(cols[k] for k in CONFIG_COLUMNS + STEP_COLUMNS)))
+
+
+def write_parquet(path, results):
+    pa, pq = _pyarrow()
+    writer = None
+    try:
+        for cols in _batches(results):
+            table = pa.table(cols)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_npz(path, results):
+    # each column is its own array: np.load(path)["segregation"]
+    parts = list(_batches(results))
+    columns = {k: np.concatenate([np.asarray(p[k]) for p in parts]) if parts else np.array([])
+               for k in CONFIG_COLUMNS + STEP_COLUMNS}
+    np.savez_compressed(path, **columns)
+
+
+WRITERS = {".csv": write_csv, ".parquet": write_parquet, ".pq": write_parquet, ".npz": write_npz}
+
+
+def parse_values(spec, cast=float):
+    # "0.3:0.7:0.05" (end inclusive) or "0.3,0.5,0.7"
+    if ":" in spec:
+        start, stop, step = (float(x) for x in spec.split(":"))
+        return [cast(round(start + i * step, 10)) for i in range(int(round((stop - start) / step)) + 1)]
+    return [cast(x) for x in spec.split(",")]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run a grid of lesson-7 Schelling simulations without the GUI.")
+    ap.add_argument("-o", "--output", required=True, help="results file (.npz, .parquet or .csv), one row per step")
+    ap.add_argument("--size", default="20", help="grid sizes, e.g. 20,50")
+    ap.add_argument("--share-a", default="0.45")
+    ap.add_argument("--share-b", default="0.45")
+    ap.add_argument("--share-c", default="0.0")
+    ap.add_argument("--th-a", default="0.5", help="A thresholds, e.g. 0.3:0.7:0.05")
+    ap.add_argument("--th-b", default="0.5")
+    ap.add_argument("--th-c", default="0.5")
+    ap.add_argument("--neighborhood", default="moore", help="moore, von_neumann or both comma-separated")
+    ap.add_argument("--move-strategy", default="random", help="random, best or both comma-separated")
+    ap.add_argument("--radius", default="0", help="search radius for 'best' (0 = whole grid)")
+    ap.add_argument("--replicates", type=int, default=1, help="seeds per configuration")
+    ap.add_argument("--seed", type=int, default=0, help="first seed")
+    ap.add_argument("--max-steps", type=int, default=200)
+    ap.add_argument("--backend", default="numpy", choices=["python", "numpy"])
+    ap.add_argument("--incremental", action="store_true", help="use incremental neighbour counts")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args(argv)
+
+    ext = os.path.splitext(args.output)[1].lower()
+    if ext not in WRITERS:
+        ap.error("output must end in " + ", ".join(WRITERS))
+
+    configs = make_configs(parse_values(args.size, int), parse_values(args.share_a), parse_values(args.share_b),
+                           parse_values(args.share_c), parse_values(args.th_a), parse_values(args.th_b),
+                           parse_values(args.th_c), args.neighborhood.split(","), args.replicates, args.seed,
+                           args.move_strategy.split(","), parse_values(args.radius, int))
+    stats = {"runs": 0, "steps": 0}
+
+    def counted(results):
+        for cols in results:
+            stats["runs"] += 1
+            stats["steps"] += len(cols["step"])
+            yield cols
+
+    t0 = time.perf_counter()
+    results = run_all(configs, args.max_steps, args.backend, args.incremental, args.workers)
+    WRITERS[ext](args.output, counted(results))
+    elapsed = time.perf_counter() - t0
+    print(f"{stats['runs']} runs, {stats['steps']} steps in {elapsed:.2f}s "
+          f"({stats['runs'] / elapsed:,.1f} runs/s, workers={args.workers})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
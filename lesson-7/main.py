@@ -1,10 +1,26 @@
 import random
+import time
+import queue
+import multiprocessing as mp
+import numpy as np
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, messagebox
 from collections import Counter
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+KINDS = (None, 'A', 'B', 'C')  # ArrayGrid int8 codes: 0 = empty cell
+MOORE = [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]
+VON_NEUMANN = [(-1,0),(1,0),(0,-1),(0,1)]
+COLORS = {'A': "#00ADB5", 'B': "#FF5722", 'C': "#4CAF50"}
+PALETTE = np.array([[255, 255, 255], [0, 173, 181], [255, 87, 34], [76, 175, 80]], dtype=np.uint8)  # in KINDS order
+
+def grid_ppm(codes, canvas):
+    # kind codes -> canvas x canvas PPM (P6) image (nearest cell)
+    idx = np.arange(canvas) * codes.shape[0] // canvas
+    rgb = PALETTE[codes[np.ix_(idx, idx)]]
+    return b"P6 %d %d 255\n" % (canvas, canvas) + rgb.tobytes()
+
 class Agent:
     def __init__(self, kind):
         self.kind = kind
@@ -28,10 +44,7 @@ class Grid:
                 self.cells[i][j] = Agent(k) if k else None
 
     def neighbors(self, r, c):
-        if self.neighborhood == 'moore':
-            dirs = [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]
-        else:
-            dirs = [(-1,0),(1,0),(0,-1),(0,1)]
+        dirs = MOORE if self.neighborhood == 'moore' else VON_NEUMANN
         for dr, dc in dirs:
             rr, cc = r + dr, c + dc
             if 0 <= rr < self.n and 0 <= cc < self.n:
@@ -62,17 +75,277 @@ class Grid:
                 cnt['Empty' if a is None else a.kind] += 1
         return cnt
 
+    def kind_at(self, r, c):
+        a = self.cells[r][c]
+        return None if a is None else a.kind
+
+    def kind_codes(self):
+        return np.array([[KINDS.index(None if a is None else a.kind) for a in row] for row in self.cells],
+                        dtype=np.int8)
+
+    def move(self, src, dst):
+        (ri, rj), (ei, ej) = src, dst
+        self.cells[ei][ej] = self.cells[ri][rj]
+        self.cells[ri][rj] = None
+
+class ArrayGrid(Grid):
+    # Same initial layout as Grid (same seed and shuffle),
+    # but kinds live in an int8 array; neighbours are counted by summing
+    # whole-grid shifted arrays
+    def __init__(self, size, share_A=0.45, share_B=0.45, seed=42, neighborhood='moore', share_C=0.0):
+        random.seed(seed)
+        self.n = size
+        self.neighborhood = neighborhood
+        total = size * size
+        num_A = int(total * share_A)
+        num_B = int(total * share_B)
+        num_C = int(total * share_C)
+        items = [1] * num_A + [2] * num_B + [3] * num_C + [0] * (total - num_A - num_B - num_C)
+        random.shuffle(items)
+        self.kinds = np.array(items, dtype=np.int8).reshape(size, size)
+
+    def cells_snapshot(self):
+        # read-only copy in the shape of Grid.cells (slow): fresh Agent objects,
+        # so writing to it does not change the grid -- use move() for that
+        return [[Agent(KINDS[k]) if k else None for k in row] for row in self.kinds.tolist()]
+
+    def neighbor_counts(self):
+        n, k = self.n, self.kinds
+        padded = np.zeros((n + 2, n + 2), dtype=np.int8)
+        padded[1:-1, 1:-1] = k
+        same = np.zeros((n, n), dtype=np.int8)
+        occupied = np.zeros((n, n), dtype=np.int8)
+        for dr, dc in (MOORE if self.neighborhood == 'moore' else VON_NEUMANN):
+            nb = padded[1 + dr:1 + dr + n, 1 + dc:1 + dc + n]
+            occ = nb != 0
+            occupied += occ
+            same += occ & (nb == k)
+        return same, occupied
+
+    def similarity(self):
+        # similar_share for the whole grid; 1.0 on empty cells too (mask them)
+        same, occupied = self.neighbor_counts()
+        return np.divide(same, occupied, out=np.ones((self.n, self.n)), where=occupied > 0, dtype=float)
+
+    def similar_share(self, r, c):
+        # one cell: counts its neighbours directly, no whole-grid similarity()
+        kinds = self.kinds
+        me = kinds.item(r, c)
+        if not me:
+            return None
+        same, tot = 0, 0
+        for rr, cc in self.neighbors(r, c):
+            k = kinds.item(rr, cc)
+            if k:
+                tot += 1
+                same += k == me
+        return (same / tot) if tot > 0 else 1.0
+
+    def empty_positions(self):
+        return [tuple(p) for p in np.argwhere(self.kinds == 0).tolist()]
+
+    def population_stats(self):
+        counts = np.bincount(self.kinds.ravel(), minlength=len(KINDS))
+        return Counter({('Empty' if k is None else k): int(c) for k, c in zip(KINDS, counts) if c})
+
+    def kind_at(self, r, c):
+        return KINDS[self.kinds[r, c]]
+
+    def kind_codes(self):
+        return self.kinds.copy()
+
+    def move(self, src, dst):
+        self.kinds[dst] = self.kinds[src]
+        self.kinds[src] = 0
+
+class IndexedSet:
+    # list + index for O(1) add/remove and random choice
+    def __init__(self):
+        self.items, self.pos = [], {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, p):
+        return p in self.pos
+
+    def add(self, p):
+        self.pos[p] = len(self.items)
+        self.items.append(p)
+
+    def remove(self, p):
+        i = self.pos.pop(p)
+        last = self.items.pop()
+        if last != p:
+            self.items[i] = last
+            self.pos[last] = i
+
+class NeighborCounts:
+    # incremental mode: per-cell neighbour counts by kind,
+    # an index of empty cells and the dissatisfied set. A move updates only the
+    # neighbourhoods of the old and new cell. similar_share * 840 is always an integer
+    # (840 = lcm(1..8)), so similarity sums are kept without rounding error.
+    # track_empty=True: for each kind, empty cells are bucketed by score
+    # (for move_strategy='best')
+    SCALE = 840
+
+    def __init__(self, grid, thresholds, track_empty=False):
+        n = self.n = grid.n
+        dirs = MOORE if grid.neighborhood == 'moore' else VON_NEUMANN
+        code = {k: i for i, k in enumerate(KINDS)}
+        self.thresholds = thresholds  # indexed by kind code
+        self.kind = [code[grid.kind_at(i, j)] for i in range(n) for j in range(n)]
+        self.nbrs = [[(i + dr) * n + j + dc for dr, dc in dirs if 0 <= i + dr < n and 0 <= j + dc < n]
+                     for i in range(n) for j in range(n)]
+        self.counts = [0] * (len(KINDS) * n * n)
+        self.value = [0] * (n * n)
+        self.empties = IndexedSet()
+        self.dissatisfied = IndexedSet()
+        self.total = self.total_seg = self.agents = 0
+        # buckets[k][score] -> empty cells that would give a kind-k agent this score
+        self.kinds_present = sorted(set(self.kind) - {0}) if track_empty else []
+        self.buckets = {k: {} for k in self.kinds_present}
+        self.empty_score = [0] * (len(KINDS) * n * n)
+        for p, k in enumerate(self.kind):
+            if k:
+                for q in self.nbrs[p]:
+                    self.counts[4 * q + k] += 1
+        for p, k in enumerate(self.kind):
+            if k:
+                self.agents += 1
+                self._enter(p)
+            else:
+                self._add_empty(p)
+
+    def score(self, p, k):
+        # similar_share * SCALE of a kind-k agent placed at p
+        c, b = self.counts, 4 * p
+        occ = c[b + 1] + c[b + 2] + c[b + 3]
+        return self.SCALE * c[b + k] // occ if occ else self.SCALE
+
+    def _add_empty(self, p):
+        self.empties.add(p)
+        for k in self.kinds_present:
+            v = self.empty_score[4 * p + k] = self.score(p, k)
+            bucket = self.buckets[k].get(v)
+            if bucket is None:
+                bucket = self.buckets[k][v] = IndexedSet()
+            bucket.add(p)
+
+    def _remove_empty(self, p):
+        self.empties.remove(p)
+        for k in self.kinds_present:
+            v = self.empty_score[4 * p + k]
+            bucket = self.buckets[k][v]
+            bucket.remove(p)
+            if not bucket:
+                del self.buckets[k][v]
+
+    def _enter(self, p):
+        c, k, b = self.counts, self.kind[p], 4 * p
+        same, occ = c[b + k], c[b + 1] + c[b + 2] + c[b + 3]
+        v = self.SCALE * same // occ if occ else self.SCALE
+        self.value[p] = v
+        self.total += v
+        self.total_seg += abs(2 * v - self.SCALE)
+        dissatisfied = self.dissatisfied
+        if (same / occ if occ else 1.0) < self.thresholds[k]:
+            if p not in dissatisfied:
+                dissatisfied.add(p)
+        elif p in dissatisfied:
+            dissatisfied.remove(p)
+
+    def _leave(self, p):
+        v = self.value[p]
+        self.total -= v
+        self.total_seg -= abs(2 * v - self.SCALE)
+
+    def mean_similarity(self):
+        return self.total / (self.SCALE * self.agents) if self.agents else 1.0
+
+    def segregation(self):
+        return self.total_seg / (2 * self.SCALE * self.agents) if self.agents else 0.0
+
+    def _update_around(self, p, k, delta):
+        # kind-k counts around p change by delta; metrics of occupied neighbours
+        # and scores of empty neighbours are recomputed
+        kind, counts = self.kind, self.counts
+        occupied = [q for q in self.nbrs[p] if kind[q]]
+        empty = [q for q in self.nbrs[p] if not kind[q]] if self.kinds_present else []
+        for q in occupied:
+            self._leave(q)
+        for q in empty:
+            self._remove_empty(q)
+        for q in self.nbrs[p]:
+            counts[4 * q + k] += delta
+        for q in occupied:
+            self._enter(q)
+        for q in empty:
+            self._add_empty(q)
+
+    def lift(self, src):
+        # pick the agent up: src becomes empty, its kind code is returned
+        k = self.kind[src]
+        self._leave(src)
+        if src in self.dissatisfied:
+            self.dissatisfied.remove(src)
+        self.agents -= 1
+        self.kind[src] = 0
+        self._update_around(src, k, -1)
+        self._add_empty(src)
+        return k
+
+    def drop(self, dst, k):
+        self._remove_empty(dst)
+        self._update_around(dst, k, 1)
+        self.kind[dst] = k
+        self.agents += 1
+        self._enter(dst)
+
+    def move(self, src, dst):
+        self.drop(dst, self.lift(src))
+
+    def best_empty(self, k, near=None, radius=0):
+        # highest-scoring empty cell for kind k (random among ties);
+        # with radius > 0 only from the (2r+1)^2 window around near
+        if radius <= 0:
+            buckets = self.buckets[k]
+            v = max(buckets)
+            return random.choice(buckets[v].items), v
+        n, (r, c) = self.n, divmod(near, self.n)
+        best, best_v = [], -1
+        for i in range(max(0, r - radius), min(n, r + radius + 1)):
+            for p in range(i * n + max(0, c - radius), i * n + min(n, c + radius + 1)):
+                if not self.kind[p]:
+                    v = self.score(p, k)
+                    if v > best_v:
+                        best, best_v = [p], v
+                    elif v == best_v:
+                        best.append(p)
+        return random.choice(best), best_v
+
 class Simulation:
     def __init__(self, size=20, share_A=0.45, share_B=0.45, share_C=0.0,
                  th_A=0.5, th_B=0.5, th_C=0.5, max_steps=200,
-                 seed=42, neighborhood='moore', move_strategy='best'):
-        self.grid = Grid(size, share_A, share_B, seed=seed,
-                         neighborhood=neighborhood, share_C=share_C)
+                 seed=42, neighborhood='moore', move_strategy='random', backend='python',
+                 incremental=False, radius=0):
+        # backend='numpy': ArrayGrid, the same seed gives the same history
+        grid_cls = ArrayGrid if backend == 'numpy' else Grid
+        self.grid = grid_cls(size, share_A, share_B, seed=seed,
+                             neighborhood=neighborhood, share_C=share_C)
+        self.backend = backend
         self.th_A, self.th_B, self.th_C = th_A, th_B, th_C
         self.max_steps = max_steps
         self.move_strategy = move_strategy
+        self.radius = radius  # search radius for 'best'; 0 = whole grid
         self.history = []
         self.step_count = 0
+        # incremental=True: neighbour counts are maintained, a step is ~O(moves);
+        # random draws are taken differently, so history differs from the full mode
+        # move_strategy='best' also runs on these counts and the empty-cell scores
+        best = move_strategy == 'best'
+        self.counts = (NeighborCounts(self.grid, (None, th_A, th_B, th_C), track_empty=best)
+                       if incremental or best else None)
 
     def dissatisfied_for(self, kind, s):
         if kind == 'A':
@@ -84,6 +357,12 @@ class Simulation:
         return False
 
     def step(self):
+        if self.move_strategy == 'best':
+            return self._step_best()
+        if self.counts is not None:
+            return self._step_incremental()
+        if self.backend == 'numpy':
+            return self._step_array()
         n = self.grid.n
         dissatisfied, similarities = [], []
         for i in range(n):
@@ -112,7 +391,156 @@ class Simulation:
         self.history.append((self.step_count, dr, ms, seg))
         return moves, dr, ms, seg
 
+    def _step_incremental(self):
+        # same distribution as step(): random k-subsets of the dissatisfied and the
+        # empty cells are paired at random; metrics are taken before the moves
+        st, n = self.counts, self.grid.n
+        ms, seg = st.mean_similarity(), st.segregation()
+        num_d, num_e = len(st.dissatisfied), len(st.empties)
+        moves = min(num_d, num_e)
+        movers = random.sample(st.dissatisfied.items, moves)
+        targets = random.sample(st.empties.items, moves)
+        for src, dst in zip(movers, targets):
+            st.move(src, dst)
+            self.grid.move(divmod(src, n), divmod(dst, n))
+        self.step_count += 1
+        dr = (num_d - moves) / max(1, (n * n - (num_e - moves)))
+        self.history.append((self.step_count, dr, ms, seg))
+        return moves, dr, ms, seg
+
+    def _step_best(self):
+        # the dissatisfied, in random order, move to the most similar empty cell
+        # for their kind (only if it improves); scores are updated after every move
+        st, n = self.counts, self.grid.n
+        ms, seg = st.mean_similarity(), st.segregation()
+        dissatisfied = list(st.dissatisfied.items)
+        random.shuffle(dissatisfied)
+        moves = 0
+        for src in dissatisfied:
+            k = st.lift(src)
+            dst, v = st.best_empty(k, src, self.radius)
+            if v <= st.score(src, k):
+                dst = src
+            st.drop(dst, k)
+            if dst != src:
+                self.grid.move(divmod(src, n), divmod(dst, n))
+                moves += 1
+        self.step_count += 1
+        dr = (len(dissatisfied) - moves) / max(1, (n * n - len(st.empties)))
+        self.history.append((self.step_count, dr, ms, seg))
+        return moves, dr, ms, seg
+
+    def _step_array(self):
+        # same order as step(): row-major lists, two shuffles,
+        # moves paired from the end; sums also go through Python sum()
+        g = self.grid
+        n = g.n
+        occupied = g.kinds != 0
+        sim = g.similarity()
+        th = np.array([np.inf, self.th_A, self.th_B, self.th_C])
+        dissatisfied = np.flatnonzero(occupied & (sim < th[g.kinds])).tolist()
+        empties = np.flatnonzero(~occupied).tolist()
+        similarities = sim[occupied]
+        random.shuffle(dissatisfied)
+        random.shuffle(empties)
+        moves = min(len(dissatisfied), len(empties))
+        if moves:
+            flat = g.kinds.reshape(-1)
+            src, dst = dissatisfied[-moves:], empties[-moves:]
+            flat[dst] = flat[src]
+            flat[src] = 0
+            del dissatisfied[-moves:], empties[-moves:]
+        self.step_count += 1
+        dr = len(dissatisfied) / max(1, (n * n - len(empties)))
+        count = len(similarities)
+        ms = sum(similarities.tolist()) / count if count else 1.0
+        seg = sum(np.abs(similarities - 0.5).tolist()) / count if count else 0.0
+        self.history.append((self.step_count, dr, ms, seg))
+        return moves, dr, ms, seg
+
+def _run_worker(sim, rng_state, out, stop, cancel, steps_per_s, interval):
+    # worker process: steps run continuously, frames are sent only when the queue
+    # has room (stale ones are dropped); metrics are never lost
+    random.setstate(rng_state)
+    pending, last = [], 0.0
+    started, first = time.perf_counter(), sim.step_count
+    while not stop.is_set():
+        moves, dr, ms, seg = sim.step()
+        pending.append((sim.step_count, dr, ms, seg))
+        if moves == 0 or sim.step_count >= sim.max_steps:
+            break
+        now = time.perf_counter()
+        if now - last >= interval:
+            try:
+                out.put_nowait(("frame", sim.grid.kind_codes().tobytes(), pending))
+                pending, last = [], now
+            except queue.Full:
+                pass
+        if steps_per_s > 0:
+            time.sleep(max(0.0, started + (sim.step_count - first) / steps_per_s - time.perf_counter()))
+    # On cancel nobody reads the result: exit at once without waiting for the
+    # queue feeder thread to flush unread frames
+    if cancel.is_set():
+        out.cancel_join_thread()
+        return
+    # On stop (pause / finished) the final state goes back to the GUI
+    while not cancel.is_set():
+        try:
+            out.put(("final", sim, random.getstate()), timeout=0.1)
+            return
+        except queue.Full:
+            pass
+    out.cancel_join_thread()
+
+class SimulationWorker:
+    # Simulation runs in a separate process; the GUI reads the queue at its own pace.
+    # Frames: ("frame", kind-code bytes, [(step, dr, ms, seg), ...]),
+    # at the end: ("final", Simulation, random.getstate())
+    def __init__(self, sim, steps_per_s=0, maxsize=4, interval=0.02):
+        ctx = mp.get_context("spawn")
+        self.n = sim.grid.n
+        self.queue = ctx.Queue(maxsize)
+        self.stop_event = ctx.Event()
+        self.cancel_event = ctx.Event()
+        self.process = ctx.Process(target=_run_worker, daemon=True,
+                                   args=(sim, random.getstate(), self.queue, self.stop_event, self.cancel_event,
+                                         steps_per_s, interval))
+
+    def start(self):
+        self.process.start()
+
+    def stop(self):
+        # soft stop: the worker sends "final" and exits
+        self.stop_event.set()
+
+    def drain(self):
+        msgs = []
+        while True:
+            try:
+                msgs.append(self.queue.get_nowait())
+            except queue.Empty:
+                return msgs
+
+    def decode(self, data):
+        return np.frombuffer(data, dtype=np.int8).reshape(self.n, self.n)
+
+    def cancel(self, timeout=1.0):
+        # Reset/close: the result is not needed, the worker exits without "final"
+        self.cancel_event.set()
+        self.stop_event.set()
+        self.drain()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.queue.cancel_join_thread()
+        self.queue.close()
+
 class App(tk.Tk):
+    CANVAS = 400
+    RECT_LIMIT = 100   # larger grids are drawn as a single PhotoImage
+    FRAME_MS = 33      # never redraw faster than ~30 FPS
+
     def __init__(self):
         super().__init__()
         self.title("Schelling Model Simulation")
@@ -121,7 +549,11 @@ class App(tk.Tk):
         self.sim = None
         self.running = False
         self._after_id = None
+        self._shown = None
+        self._photo = None
+        self.worker = None
         self._build_ui()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
     def _build_ui(self):
         frm_left = ttk.Frame(self, padding=10)
@@ -131,112 +563,222 @@ class App(tk.Tk):
         self.var_N = tk.IntVar(value=20)
         ttk.Entry(frm_left, textvariable=self.var_N, width=10).pack(pady=2)
 
+        ttk.Label(frm_left, text="Backend:").pack()
+        self.var_backend = tk.StringVar(value="python")
+        ttk.Combobox(frm_left, textvariable=self.var_backend, values=["python", "numpy"],
+                     state="readonly", width=8).pack(pady=2)
+
+        ttk.Label(frm_left, text="Move Strategy:").pack()
+        self.var_strategy = tk.StringVar(value="random")
+        ttk.Combobox(frm_left, textvariable=self.var_strategy, values=["random", "best"],
+                     state="readonly", width=8).pack(pady=2)
+
+        ttk.Label(frm_left, text="Steps/s (0 = max):").pack()
+        self.var_sps = tk.DoubleVar(value=10)
+        ttk.Entry(frm_left, textvariable=self.var_sps, width=10).pack(pady=2)
+
+        self.var_worker = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frm_left, text="Background worker", variable=self.var_worker).pack(pady=2)
+
         ttk.Button(frm_left, text="Init Grid", command=self.init_grid).pack(pady=5)
         ttk.Button(frm_left, text="Step", command=self.step_once).pack(pady=5)
         ttk.Button(frm_left, text="Run", command=self.run_sim).pack(pady=5)
         ttk.Button(frm_left, text="Stop", command=self.stop_sim).pack(pady=5)
         ttk.Button(frm_left, text="Reset", command=self.reset_sim).pack(pady=5)
 
-        self.canvas = tk.Canvas(self, width=400, height=400, bg="white")
+        self.canvas = tk.Canvas(self, width=self.CANVAS, height=self.CANVAS, bg="white")
         self.canvas.pack(side="left", padx=20, pady=20)
 
-        # Grafik
+        # Plot: lines are created once, then only set_data
         self.fig, self.ax = plt.subplots(figsize=(4,3))
-        self.ax.set_title("Metrics")
-        self.ax.set_xlabel("Steps")
-        self.ax.set_ylabel("Values")
         self.canvas_graph = FigureCanvasTkAgg(self.fig, master=self)
         self.canvas_graph.get_tk_widget().pack(side="right", fill="both", expand=True)
+        self._reset_graph()
 
-    def init_grid(self):
-        n = self.var_N.get()
-        self.sim = Simulation(size=n)
-        self._draw_grid()
+    def _reset_graph(self):
         self.ax.clear()
         self.ax.set_title("Metrics")
         self.ax.set_xlabel("Steps")
         self.ax.set_ylabel("Values")
+        self.lines = [self.ax.plot([], [], label=label, color=color)[0]
+                      for label, color in (("Dissatisfied", "red"), ("Mean Similarity", "blue"),
+                                           ("Seg. Index", "green"))]
+        self.ax.legend()
         self.canvas_graph.draw()
+
+    def init_grid(self):
+        self._cancel_worker()
+        n = self.var_N.get()
+        self.sim = Simulation(size=n, backend=self.var_backend.get(), move_strategy=self.var_strategy.get())
+        self._draw_grid()
+        self._reset_graph()
         self.running = False
 
     def _draw_grid(self):
         self.canvas.delete("all")
         n = self.sim.grid.n
-        size = 400 / n
+        codes = self.sim.grid.kind_codes()
+        self._shown = codes
+        if n > self.RECT_LIMIT:
+            self._photo = tk.PhotoImage(data=grid_ppm(codes, self.CANVAS), format="PPM")
+            self.canvas.create_image(0, 0, image=self._photo, anchor="nw")
+            return
+        self._photo = None
+        size = self.CANVAS / n
         self.rects = [[None]*n for _ in range(n)]
         for i in range(n):
             for j in range(n):
-                color = self._color_for(self.sim.grid.cells[i][j])
+                color = self._color_for(KINDS[codes[i, j]])
                 x0, y0 = j*size, i*size
                 rect = self.canvas.create_rectangle(x0, y0, x0+size, y0+size, fill=color, outline="gray")
                 self.rects[i][j] = rect
 
-    def _color_for(self, cell):
-        if cell is None:
-            return "white"
-        if cell.kind == "A":
-            return "#00ADB5"
-        if cell.kind == "B":
-            return "#FF5722"
-        if cell.kind == "C":
-            return "#4CAF50"
-        return "white"
-
-    def _update_grid(self):
-        n = self.sim.grid.n
-        for i in range(n):
-            for j in range(n):
-                color = self._color_for(self.sim.grid.cells[i][j])
-                self.canvas.itemconfig(self.rects[i][j], fill=color)
+    def _color_for(self, kind):
+        return COLORS.get(kind, "white")
+
+    def _update_grid(self, codes=None):
+        # only cells changed since the last frame are repainted
+        if codes is None:
+            codes = self.sim.grid.kind_codes()
+        if self._photo is not None:
+            self._photo.configure(data=grid_ppm(codes, self.CANVAS), format="PPM")
+        else:
+            for i, j in np.argwhere(codes != self._shown).tolist():
+                self.canvas.itemconfig(self.rects[i][j], fill=self._color_for(KINDS[codes[i, j]]))
+        self._shown = codes
 
     def step_once(self):
-        if not self.sim:
+        if not self.sim or self.running:
             return
-        moves, dr, ms, seg = self.sim.step()
+        self.sim.step()
+        self._render()
+
+    def _render(self):
         self._update_grid()
         self._update_graph()
 
     def _update_graph(self):
-        steps = [h[0] for h in self.sim.history]
-        drs = [h[1] for h in self.sim.history]
-        ms = [h[2] for h in self.sim.history]
-        seg = [h[3] for h in self.sim.history]
-        self.ax.clear()
-        self.ax.plot(steps, drs, label="Dissatisfied", color="red")
-        self.ax.plot(steps, ms, label="Mean Similarity", color="blue")
-        self.ax.plot(steps, seg, label="Seg. Index", color="green")
-        self.ax.legend()
-        self.canvas_graph.draw()
+        history = self.sim.history
+        steps = [h[0] for h in history]
+        for k, line in enumerate(self.lines, start=1):
+            line.set_data(steps, [h[k] for h in history])
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.canvas_graph.draw_idle()
 
     def run_sim(self):
         if not self.sim or self.running:
             return
         self.running = True
+        if self.var_worker.get():
+            self.worker = SimulationWorker(self.sim, steps_per_s=max(0.0, self.var_sps.get()))
+            self.worker.start()
+            self._poll_worker()
+            return
+        self._credit = 1.0
+        self._last_tick = time.perf_counter()
         self._loop()
 
+    def _poll_worker(self):
+        # drain every queued message, draw only the latest frame
+        worker = self.worker
+        if worker is None:
+            return
+        # checked before draining: a worker that exited after sending "final"
+        # has already flushed it into the pipe
+        alive = worker.process.is_alive()
+        codes, final = None, None
+        for msg in worker.drain():
+            if msg[0] == "frame":
+                codes = msg[1]
+                self.sim.history.extend(msg[2])
+            else:
+                final = msg
+        if final is not None:
+            _, self.sim, rng_state = final
+            random.setstate(rng_state)  # later Steps continue from this stream
+            worker.process.join()
+            self.worker = None
+            self.running = False
+            self._after_id = None
+            self._render()
+            return
+        if codes is not None:
+            self._update_grid(worker.decode(codes))
+            self._update_graph()
+        if not alive:
+            self._worker_died()
+            return
+        self._after_id = self.after(self.FRAME_MS, self._poll_worker)
+
+    def _worker_died(self):
+        # the worker exited without "final" (exception in step() or killed):
+        # the GUI keeps the state from before Run plus the metrics received
+        code = self.worker.process.exitcode
+        self._cancel_worker()
+        messagebox.showerror("Simulation", f"The simulation worker stopped unexpectedly (exit code {code}).")
+
     def _loop(self):
+        # step rate (Steps/s) and frame rate are separate: each tick runs the
+        # accumulated steps (within at most FRAME_MS of time),
+        # then draws one frame
         if not self.running:
             return
-        moves, dr, ms, seg = self.sim.step()
-        self._update_grid()
-        self._update_graph()
-        if moves == 0 or self.sim.step_count >= self.sim.max_steps:
+        now = time.perf_counter()
+        sps = max(0.0, self.var_sps.get())
+        budget = None
+        if sps > 0:
+            self._credit = min(self._credit + sps * (now - self._last_tick), max(1.0, sps))
+            budget = int(self._credit)
+            self._credit -= budget
+        self._last_tick = now
+        deadline = now + self.FRAME_MS / 1000
+        steps, done = 0, False
+        while (budget is None or steps < budget) and time.perf_counter() < deadline:
+            moves = self.sim.step()[0]
+            steps += 1
+            if moves == 0 or self.sim.step_count >= self.sim.max_steps:
+                done = True
+                break
+        if steps:
+            self._render()
+        if done:
             self.running = False
             return
-        self._after_id = self.after(100, self._loop)
+        self._after_id = self.after(self.FRAME_MS, self._loop)
 
     def stop_sim(self):
+        if self.worker is not None:
+            # _poll_worker keeps running until the worker sends "final"
+            if not self.worker.process.is_alive():
+                self._worker_died()
+                return
+            self.worker.stop()
+            return
         if self._after_id:
             self.after_cancel(self._after_id)
             self._after_id = None
         self.running = False
 
+    def _cancel_worker(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+        if self._after_id:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        self.running = False
+
+    def _on_close(self):
+        self._cancel_worker()
+        self.destroy()
+
     def reset_sim(self):
-        self.stop_sim()
+        self._cancel_worker()
         self.sim = None
+        self._photo = None
         self.canvas.delete("all")
-        self.ax.clear()
-        self.canvas_graph.draw()
+        self._reset_graph()
 
 if __name__ == "__main__":
     app = App()
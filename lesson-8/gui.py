@@ -2,6 +2,20 @@ import tkinter as tk
 from tkinter import ttk
 import random
 import math
+import numpy as np
+
+KINDS = (1, 2)
+
+def window_counts(mask, radius):
+    # summed-area table: the sum over each cell's (2r+1)x(2r+1) window
+    # (clipped at the border), O(1) per cell whatever the radius
+    n = mask.shape[0]
+    sat = np.zeros((n + 1, n + 1), dtype=np.int32)
+    sat[1:, 1:] = mask.cumsum(0).cumsum(1)
+    idx = np.arange(n)
+    lo, hi = np.clip(idx - radius, 0, n), np.clip(idx + radius + 1, 0, n)
+    return (sat[np.ix_(hi, hi)] - sat[np.ix_(lo, hi)]
+            - sat[np.ix_(hi, lo)] + sat[np.ix_(lo, lo)])
 
 class Agent:
     def __init__(self, kind):
@@ -26,24 +40,64 @@ class Grid:
                     neighbors.append(self.grid[i][j])
         return neighbors
 
-    def update(self, tolerance=0.3):
+    def kinds(self):
+        return np.array([[a.kind if a else 0 for a in row] for row in self.grid], dtype=np.int8)
+
+    def update(self, tolerance=0.3, radius=1, mode="sequential"):
+        # sequential: the old semantics (agents row by row, each sees the
+        # current state); synchronous: everyone is evaluated from the same
+        # starting state and written to a new grid (double buffer)
         empty_cells = [(i, j) for i in range(self.size) for j in range(self.size) if not self.grid[i][j]]
         random.shuffle(empty_cells)
-        for i in range(self.size):
-            for j in range(self.size):
+        kinds = self.kinds()
+        counts = {k: window_counts(kinds == k, radius) for k in KINDS}  # includes the cell itself
+        if mode == "synchronous":
+            self._update_synchronous(tolerance, empty_cells, kinds, counts)
+        else:
+            self._update_sequential(tolerance, radius, empty_cells, counts)
+
+    def _update_sequential(self, tolerance, radius, empty_cells, counts):
+        # a move adjusts the window sums by +-1 only around the old and new
+        # cell, so the result matches get_neighbors
+        n = self.size
+        occupied = sum(counts.values())
+        for i in range(n):
+            for j in range(n):
                 agent = self.grid[i][j]
                 if agent:
-                    neighbors = self.get_neighbors(i, j)
-                    if not neighbors:
+                    total = int(occupied[i, j]) - 1
+                    if not total:
                         continue
-                    same_kind = sum(1 for n in neighbors if n.kind == agent.kind)
-                    ratio = same_kind / len(neighbors)
+                    ratio = (int(counts[agent.kind][i, j]) - 1) / total
                     agent.satisfied = ratio >= tolerance
                     if not agent.satisfied and empty_cells:
                         new_x, new_y = empty_cells.pop()
                         self.grid[new_x][new_y] = agent
                         self.grid[i][j] = None
                         empty_cells.append((i, j))
+                        for (x, y), d in (((i, j), -1), ((new_x, new_y), 1)):
+                            win = (slice(max(0, x - radius), x + radius + 1), slice(max(0, y - radius), y + radius + 1))
+                            counts[agent.kind][win] += d
+                            occupied[win] += d
+
+    def _update_synchronous(self, tolerance, empty_cells, kinds, counts):
+        total = sum(counts.values()) - 1
+        same = np.zeros_like(total)
+        for k in KINDS:
+            same[kinds == k] = counts[k][kinds == k] - 1
+        evaluated = (kinds != 0) & (total > 0)
+        satisfied = np.divide(same, total, out=np.ones(total.shape), where=evaluated) >= tolerance
+        for i, j in np.argwhere(evaluated).tolist():
+            self.grid[i][j].satisfied = bool(satisfied[i, j])
+        # the dissatisfied move row by row only into cells that were empty at
+        # the start; vacated cells count as occupied until the next update, so
+        # the writes never affect the evaluated state (counts)
+        for i, j in np.argwhere(evaluated & ~satisfied).tolist():
+            if not empty_cells:
+                break
+            new_x, new_y = empty_cells.pop()
+            self.grid[new_x][new_y] = self.grid[i][j]
+            self.grid[i][j] = None
 
 class SchellingApp(tk.Tk):
     def __init__(self, size=20, cell_size=25):
@@ -72,6 +126,11 @@ class SchellingApp(tk.Tk):
         self.start_btn = ttk.Button(self, text="Start Simulation", command=self.start_simulation)
         self.start_btn.pack(pady=10)
 
+        # --- Update mode: sequential (old) or synchronous ---
+        self.update_mode = tk.StringVar(value="sequential")
+        ttk.Combobox(self, textvariable=self.update_mode, values=["sequential", "synchronous"],
+                     state="readonly", width=12).pack()
+
         self.running = False
         self.draw_grid()
 
@@ -125,7 +184,7 @@ class SchellingApp(tk.Tk):
     def animate(self):
         if not self.running:
             return
-        self.grid_model.update()
+        self.grid_model.update(mode=self.update_mode.get())
         self.draw_grid()
         self.after(300, self.animate)
 
@@ -1,6 +1,13 @@
-import math, random
+import copy, csv, json, math, os, random, struct, time, weakref
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
 import tkinter as tk
-from tkinter import ttk
+from tkinter import filedialog, messagebox, ttk
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy is optional: without it NN distances use the cell list
+    cKDTree = None
 
 # ----------------- small vector helpers -----------------
 def add(a,b): return (a[0]+b[0], a[1]+b[1])
@@ -39,10 +46,279 @@ class Agent:
         self.energy = energy
         self.is_leader = leader
 
+    # colour is computed only when drawing needs it
+    color = property(lambda self: energy_color(self.energy))
+
+    def pos(self): return (self.x, self.y)
+    def vel(self): return (self.vx, self.vy)
+
+class AgentView:
+    # Agent interface for backend='numpy' (GUI and metrics): values are read from the arrays
+    __slots__ = ('sim', 'i')
+    def __init__(self, sim, i):
+        self.sim = sim; self.i = i
+    x = property(lambda self: float(self.sim.pos[self.i, 0]))
+    y = property(lambda self: float(self.sim.pos[self.i, 1]))
+    vx = property(lambda self: float(self.sim.vel[self.i, 0]))
+    vy = property(lambda self: float(self.sim.vel[self.i, 1]))
+    energy = property(lambda self: float(self.sim.energy[self.i]))
+    type = property(lambda self: TYPES[self.sim.types[self.i]])
+    is_leader = property(lambda self: bool(self.sim.leader[self.i]))
+    color = property(lambda self: energy_color(self.energy))
     def pos(self): return (self.x, self.y)
     def vel(self): return (self.vx, self.vy)
 
+TYPES = ('A', 'B', 'C')
+PAIR_CHUNK = 1 << 20   # numpy backend: pairs examined at a time
+
+def energy_color(energy):
+    return f"#{int(255*(1-energy)):02x}{int(255*energy):02x}40"
+
+class CellList:
+    # CSR cell list: agents are sorted by cell number, indices in
+    # offsets[c]:offsets[c+1] are the agents in cell c. Cells tile the domain
+    # exactly (W/nx x H/ny >= r); the neighbour-cell table is built once
+    # (wrapped when periodic), and on small grids (nx < 3) no cell is
+    # listed twice.
+    def __init__(self, W, H, r, periodic=True):
+        self.W, self.H, self.r, self.periodic = W, H, r, periodic
+        size = max(1.0, r)
+        self.nx = max(1, int(W / size))
+        self.ny = max(1, int(H / size))
+        self.cw, self.ch = W / self.nx, H / self.ny
+        rows = []
+        for cx in range(self.nx):
+            for cy in range(self.ny):
+                cells = []
+                for dx in (-1, 0, 1):
+                    for dy in (-1, 0, 1):
+                        x, y = cx + dx, cy + dy
+                        if periodic:
+                            x, y = x % self.nx, y % self.ny
+                        elif not (0 <= x < self.nx and 0 <= y < self.ny):
+                            continue
+                        if x * self.ny + y not in cells:
+                            cells.append(x * self.ny + y)
+                rows.append(cells)
+        self.neighbors = rows  # lists for the python path
+        self.table = np.full((len(rows), 9), -1, dtype=np.int64)
+        for c, cells in enumerate(rows):
+            self.table[c, :len(cells)] = cells
+
+    def cell_of(self, x, y):
+        return min(int(x / self.cw), self.nx - 1) * self.ny + min(int(y / self.ch), self.ny - 1)
+
+    def cells_of(self, pos):
+        cx = np.minimum((pos[:, 0] / self.cw).astype(np.int64), self.nx - 1)
+        cy = np.minimum((pos[:, 1] / self.ch).astype(np.int64), self.ny - 1)
+        return cx * self.ny + cy
+
+    def build(self, pos):
+        self.cell = self.cells_of(pos)
+        self.indices = np.argsort(self.cell, kind='stable')
+        counts = np.bincount(self.cell, minlength=self.nx * self.ny)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        return self
+
+    def iter_pairs(self, pos, chunk=PAIR_CHUNK, rows=None):
+        # (i, j, dx, dy, d2) arrays: j != i, |d| <= r; dx = x_j - x_i
+        # (shortest wrapped difference when periodic). Pairs come ~chunk at
+        # a time; with rows, only for those agents (i from that list)
+        self.build(pos)
+        rows = np.arange(len(pos)) if rows is None else np.asarray(rows)
+        N = len(rows)
+        nbr = self.table[self.cell[rows]]
+        lens = np.where(nbr >= 0, self.offsets[nbr + 1] - self.offsets[nbr], 0)
+        per_agent = np.cumsum(lens.sum(axis=1))
+        bounds = [0, *np.searchsorted(per_agent, np.arange(chunk, per_agent[-1] if N else 0, chunk)), N]
+        r2 = self.r * self.r
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            if a >= b: continue
+            L = lens[a:b].ravel()
+            i = np.repeat(np.repeat(rows[a:b], nbr.shape[1]), L)
+            start = np.repeat(self.offsets[np.maximum(nbr[a:b], 0)].ravel(), L)
+            j = self.indices[start + np.arange(L.sum()) - np.repeat(np.cumsum(L) - L, L)]
+            dx = pos[j, 0] - pos[i, 0]; dy = pos[j, 1] - pos[i, 1]
+            if self.periodic:
+                dx -= self.W * (dx > self.W / 2); dx += self.W * (dx < -self.W / 2)
+                dy -= self.H * (dy > self.H / 2); dy += self.H * (dy < -self.H / 2)
+            d2 = dx * dx + dy * dy
+            keep = (j != i) & (d2 <= r2)
+            yield i[keep], j[keep], dx[keep], dy[keep], d2[keep]
+
+    def pairs(self, pos):
+        parts = list(self.iter_pairs(pos))
+        if not parts:
+            return tuple(np.empty(0, dtype=t) for t in (np.int64, np.int64, float, float, float))
+        return tuple(np.concatenate(col) for col in zip(*parts))
+
+class ZoneIndex:
+    # recharge zones bucketed by boids cell-list cell: each cell holds the zones
+    # that reach it (in original order), and an agent checks only its own
+    # cell's zones -- O(N x nearby zones) instead of O(N x zones)
+    def __init__(self, cells, zones):
+        self.cells = cells
+        self.zones = [tuple(float(v) for v in z) for z in zones]
+        ids = [[] for _ in range(cells.nx * cells.ny)]
+        for k, (zx, zy, zr, rate) in enumerate(self.zones):
+            for cx in self._span(zx, zr, cells.cw, cells.nx, cells.W):
+                for cy in self._span(zy, zr, cells.ch, cells.ny, cells.H):
+                    ids[cx * cells.ny + cy].append(k)
+        self.buckets = [[self.zones[k] for k in b] for b in ids]
+        counts = np.array([len(b) for b in ids], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.ids = np.array([k for b in ids for k in b], dtype=np.int64)
+        self.table = np.array(self.zones, dtype=float).reshape(-1, 4)
+
+    def _span(self, c, r, size, n, L):
+        # cell columns the interval [c-r, c+r] falls into (with a small margin)
+        pad = 1e-9 * L
+        lo = math.floor((c - r - pad) / size)
+        hi = math.floor((c + r + pad) / size)
+        if self.cells.periodic:
+            return range(n) if hi - lo + 1 >= n else sorted({k % n for k in range(lo, hi + 1)})
+        return range(max(0, lo), min(n - 1, hi) + 1)
+
+    def near(self, x, y):
+        return self.buckets[self.cells.cell_of(x, y)]
+
+    def recharge(self, pos, dt):
+        # energy each agent gains over dt (all agents at once)
+        N = len(pos)
+        cell = self.cells.cells_of(pos)
+        lens = self.offsets[cell + 1] - self.offsets[cell]
+        if not lens.sum():
+            return np.zeros(N)
+        i = np.repeat(np.arange(N), lens)
+        z = self.ids[np.repeat(self.offsets[cell], lens) + np.arange(lens.sum()) - np.repeat(np.cumsum(lens) - lens, lens)]
+        zx, zy, zr, rate = self.table[z].T
+        dx = zx - pos[i, 0]; dy = zy - pos[i, 1]
+        if self.cells.periodic:
+            W, H = self.cells.W, self.cells.H
+            dx -= W * (dx > W / 2); dx += W * (dx < -W / 2)
+            dy -= H * (dy > H / 2); dy += H * (dy < -H / 2)
+        inside = np.hypot(dx, dy) <= zr
+        return np.bincount(i[inside], weights=rate[inside] * dt, minlength=N)
+
+def load_zones(path):
+    # CSV: x,y,r,rate per row; the first row may be a header, '#' starts a comment
+    zones = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for n, row in enumerate(csv.reader(f), 1):
+            if not row or row[0].lstrip().startswith("#"):
+                continue
+            try:
+                zx, zy, zr, rate = (float(v) for v in row[:4])
+            except ValueError:
+                if zones or n > 1:
+                    raise ValueError(f"{path}:{n}: expected x,y,r,rate, got {','.join(row)}")
+                continue
+            zones.append((zx, zy, zr, rate))
+    return zones
+
+def nn_distances(pos, W, H, periodic=True):
+    # distance from each agent to its nearest neighbour, O(N log N):
+    # cKDTree with scipy (boxsize for the torus), otherwise the cell list -- the
+    # radius starts at the mean spacing and doubles for agents with no neighbour found
+    N = len(pos)
+    if N <= 1:
+        return np.zeros(N)
+    if cKDTree is not None:
+        tree = cKDTree(pos, boxsize=(W, H) if periodic else None)
+        return tree.query(pos, k=2)[0][:, 1]
+    best = np.full(N, np.inf)
+    todo = np.arange(N)
+    r = math.sqrt(W * H / N)
+    while todo.size:
+        for i, j, dx, dy, d2 in CellList(W, H, r, periodic).iter_pairs(pos, rows=todo):
+            if len(i):  # pairs are grouped by i, in order
+                first = np.flatnonzero(np.r_[True, i[1:] != i[:-1]])
+                best[i[first]] = np.minimum(best[i[first]], np.minimum.reduceat(d2, first))
+        todo = todo[best[todo] > r * r]  # a neighbour found within r is the true nearest
+        if r > W + H:
+            break
+        r *= 2
+    return np.sqrt(best)
+
+def flock_metrics(pos, vel, W, H, periodic=True):
+    # (polarization, mean_speed, mean_nn_distance); shared by simulations and recordings
+    N = len(pos)
+    if N == 0: return 0.0, 0.0, 0.0
+    speed = np.hypot(vel[:, 0], vel[:, 1])
+    spd_sum = speed.sum()
+    pol = 0.0 if spd_sum < 1e-12 else float(np.hypot(*vel.sum(axis=0)) / spd_sum)
+    nn = float(nn_distances(pos, W, H, periodic).mean()) if N > 1 else 0.0
+    return pol, float(speed.mean()), nn
+
+class MetricsCollector:
+    # polarization, mean speed and NN distance in one pass, every `every` steps;
+    # samples: [(t, polarization, mean_speed, mean_nn), ...]
+    def __init__(self, sim, every=10):
+        self.sim = sim
+        self.every = max(1, every)
+        self.samples = []
+        self._last = None
+
+    def maybe_sample(self):
+        t = self.sim.t
+        if self._last is not None and t - self._last < self.every:
+            return None
+        return self.sample()
+
+    def sample(self):
+        self._last = self.sim.t
+        row = (self.sim.t, *self.sim.metrics())
+        self.samples.append(row)
+        return row
+
+MASK64 = (1 << 64) - 1
+
+def _mix64(x):
+    # splitmix64 finalizer (on uint64 arrays, overflow wraps mod 2^64)
+    x ^= x >> np.uint64(30); x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27); x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return x
+
+def counter_uniform(seed, t, ids, k=2):
+    # counter-based RNG: (seed, step, agent, k) -> [0, 1); stateless, so an
+    # agent gets the same number whichever worker computes it
+    key = (seed * 0x9E3779B97F4A7C15 + t * 0xD1B54A32D192ED03) & MASK64
+    ctr = np.asarray(ids, dtype=np.uint64)[:, None] * np.uint64(k) + np.arange(k, dtype=np.uint64)
+    x = _mix64(np.uint64(key) + ctr * np.uint64(0x9E3779B97F4A7C15))
+    return (x >> np.uint64(11)).astype(float) * (1.0 / (1 << 53))
+
+# backend='parallel': the torus is cut into strips along x; state (2, N, 5) lives in
+# shared memory (x, y, vx, vy, energy; two buffers). Each worker reads its strip's
+# agents plus an r_neigh-wide halo from the neighbouring strips and writes the next buffer
+_strip = {}
+
+def _strip_init(kernel, shm_name, N, strips):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _strip.update(sim=kernel, shm=shm, state=np.ndarray((2, N, 5), dtype=float, buffer=shm.buf), strips=strips)
+
+def _strip_step(job, ctx=None):
+    k, t, cur = job
+    ctx = _strip if ctx is None else ctx
+    sim, strips = ctx['sim'], ctx['strips']
+    src, dst = ctx['state'][cur], ctx['state'][1 - cur]
+    x = src[:, 0]
+    width = sim.W / strips
+    own = np.minimum((x / width).astype(np.int64), strips - 1) == k
+    if not own.any():
+        return
+    x0, reach = k * width, sim.r_neigh * (1 + 1e-9) + 1e-9
+    if sim.reflective:
+        halo = (x >= x0 - reach) & (x < x0 + width + reach)
+    else:
+        halo = ((x - x0) % sim.W < width + reach) | ((x0 - x) % sim.W <= reach)
+    local = np.flatnonzero(own | halo)  # global order: pair order does not depend on strips
+    rows = np.flatnonzero(own[local])
+    dst[local[rows]] = sim._strip_update(src[local], rows, local, src, t)
+
 class MultiAgentSim:
+    PHASES = ('prepare', 'compute', 'integrate')
+
     def __init__(self,
                  W=160.0, H=100.0, N=60, seed=1,
                  v_max=2.0, r_neigh=12.0,
@@ -51,8 +327,10 @@ class MultiAgentSim:
                  leader=False, leader_dir=(1.0,0.0), leader_influence=0.6,
                  reflective=False, use_cell_list=True,
                  energy_model=False, energy_cost=0.01, recharge_zones=None,
-                 types_fraction=(0.4,0.3,0.3)):
+                 types_fraction=(0.4,0.3,0.3), backend='python', leaders=1, profile_hook=None,
+                 workers=1):
         random.seed(seed)
+        self.seed = seed
         self.W, self.H = W, H
         self.N = N
         self.v_max = v_max
@@ -63,13 +341,22 @@ class MultiAgentSim:
         self.dt = dt
         self.t = 0
         self.leader_enabled = leader
-        self.leader_dir = norm(leader_dir)
+        # several leaders: leader_dir is one (dx, dy) or a list with one per leader
+        dirs = leader_dir if isinstance(leader_dir[0], (tuple, list)) else [leader_dir]
+        self.leader_dirs = [norm(d) for d in dirs]
+        self.leader_dir = self.leader_dirs[0]
+        self.leader_ids = list(range(min(N, leaders))) if leader else []
         self.leader_influence = leader_influence
         self.reflective = reflective
         self.use_cell_list = use_cell_list
         self.energy_model = energy_model
         self.energy_cost = energy_cost
-        self.recharge_zones = recharge_zones or []
+        if isinstance(recharge_zones, str):
+            recharge_zones = load_zones(recharge_zones)
+        self.recharge_zones = list(recharge_zones or [])
+        # profile_hook(t, {'prepare': s, 'compute': s, 'integrate': s}) after every step
+        self.profile_hook = profile_hook
+        self.phase_times = dict.fromkeys(self.PHASES, 0.0)
 
         # prepare types list
         fa, fb, fc = types_fraction
@@ -81,57 +368,116 @@ class MultiAgentSim:
             else: types.append('C')
 
         self.agents = []
-        leader_assigned = False
         for i in range(N):
             x = random.random()*W
             y = random.random()*H
             ang = random.random()*2*math.pi
             v = (math.cos(ang)*v_max*0.5, math.sin(ang)*v_max*0.5)
-            is_leader = False
-            if self.leader_enabled and not leader_assigned:
-                is_leader=True; leader_assigned=True
-                v = mul(self.leader_dir, v_max)
+            is_leader = i < len(self.leader_ids)
+            if is_leader:
+                v = mul(self.leader_dir_of(i), v_max)
             a = Agent(x,y,v[0],v[1], atype=types[i], energy=1.0, leader=is_leader)
             self.agents.append(a)
 
-        # cell list
+        # cell list: cells are W/nx x H/ny (>= r_neigh) and tile the domain exactly
         self.cell_size = max(1.0, self.r_neigh)
-        self.nx = max(1, int(self.W / self.cell_size))
-        self.ny = max(1, int(self.H / self.cell_size))
+        self.cell_list = CellList(self.W, self.H, self.r_neigh, periodic=not self.reflective)
+        self.nx, self.ny = self.cell_list.nx, self.cell_list.ny
+        self.zone_index = ZoneIndex(self.cell_list, self.recharge_zones)
+
+        # backend='numpy': state in (N,2) arrays (structure of arrays); the initial
+        # state matches the python backend, noise comes from a numpy generator.
+        # backend='parallel': the same kernels over strips in `workers` processes,
+        # noise from counter_uniform -- results do not depend on the worker count
+        self.backend = backend
+        self.vectorized = backend in ('numpy', 'parallel')
+        self.leader_dir_table = np.array([self.leader_dir_of(i) for i in self.leader_ids]).reshape(-1, 2)
+        if self.vectorized:
+            self.pos = np.array([a.pos() for a in self.agents], dtype=float).reshape(N, 2)
+            self.vel = np.array([a.vel() for a in self.agents], dtype=float).reshape(N, 2)
+            self.energy = np.ones(N)
+            self.types = np.array([TYPES.index(a.type) for a in self.agents], dtype=np.int8)
+            self.leader = np.array([a.is_leader for a in self.agents], dtype=bool)
+            self.rng = np.random.default_rng(seed)
+            self.agents = [AgentView(self, i) for i in range(N)]
+        if backend == 'parallel':
+            self._start_strips(max(1, workers))
+
+    def _start_strips(self, workers):
+        N = self.N
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, 2 * N * 5 * 8))
+        self.state = np.ndarray((2, N, 5), dtype=float, buffer=self._shm.buf)
+        self.state[0] = np.column_stack([self.pos, self.vel, self.energy])
+        self._cur = 0
+        self._use_buffer(0)
+        self.workers = workers
+        self._strip_ctx = None
+        self._pool = None
+        kernel = self._kernel()
+        if workers == 1:
+            self._strip_ctx = dict(sim=kernel, state=self.state, strips=1)
+        else:
+            self._pool = mp.get_context("spawn").Pool(workers, initializer=_strip_init,
+                                                      initargs=(kernel, self._shm.name, N, workers))
+        self._finalizer = weakref.finalize(self, MultiAgentSim._release, self._pool, self._shm)
+
+    def _kernel(self):
+        # light copy sent to workers: only parameters, the cell list and zones
+        k = copy.copy(self)
+        for name in ('agents', 'pos', 'vel', 'energy', 'types', 'leader', 'rng', 'state',
+                     '_shm', '_pool', '_strip_ctx', '_finalizer', 'profile_hook'):
+            k.__dict__.pop(name, None)
+        k.cell_list = copy.copy(self.cell_list)
+        return k
+
+    def _use_buffer(self, b):
+        self.pos, self.vel, self.energy = self.state[b, :, 0:2], self.state[b, :, 2:4], self.state[b, :, 4]
+
+    @staticmethod
+    def _release(pool, shm):
+        if pool is not None:
+            pool.terminate()
+        shm.close()
+        shm.unlink()
+
+    def close(self):
+        # backend='parallel': release the workers and the shared memory
+        if getattr(self, '_finalizer', None) is not None:
+            self.state = self.pos = self.vel = self.energy = None
+            self._finalizer()
+
+    def set_recharge_zones(self, zones):
+        self.recharge_zones = list(zones)
+        self.zone_index = ZoneIndex(self.cell_list, self.recharge_zones)
 
     # neighbors
     def build_cell_list(self):
         cells = {}
         for idx,a in enumerate(self.agents):
-            cx = int(a.x / self.cell_size) % self.nx
-            cy = int(a.y / self.cell_size) % self.ny
-            cells.setdefault((cx,cy), []).append(idx)
+            cells.setdefault(self.cell_list.cell_of(a.x, a.y), []).append(idx)
         return cells
 
     def neighbors_cell(self, i, cells):
         ai = self.agents[i]
         res = []
-        cx = int(ai.x / self.cell_size) % self.nx
-        cy = int(ai.y / self.cell_size) % self.ny
-        for dx_cell in (-1,0,1):
-            for dy_cell in (-1,0,1):
-                ncx = (cx+dx_cell) % self.nx
-                ncy = (cy+dy_cell) % self.ny
-                for j in cells.get((ncx,ncy), []):
-                    if j == i: continue
-                    aj = self.agents[j]
-                    if self.reflective:
-                        dx = aj.x - ai.x; dy = aj.y - ai.y
-                    else:
-                        dx = torus_delta(ai.x, aj.x, self.W); dy = torus_delta(ai.y, aj.y, self.H)
-                    d2 = dx*dx + dy*dy
-                    if d2 <= self.r_neigh*self.r_neigh:
-                        res.append((j, dx, dy, math.sqrt(d2)))
+        r2 = self.r_neigh*self.r_neigh
+        for c in self.cell_list.neighbors[self.cell_list.cell_of(ai.x, ai.y)]:
+            for j in cells.get(c, []):
+                if j == i: continue
+                aj = self.agents[j]
+                if self.reflective:
+                    dx = aj.x - ai.x; dy = aj.y - ai.y
+                else:
+                    dx = torus_delta(ai.x, aj.x, self.W); dy = torus_delta(ai.y, aj.y, self.H)
+                d2 = dx*dx + dy*dy
+                if d2 <= r2:
+                    res.append((j, dx, dy, math.sqrt(d2)))
         return res
 
     def neighbors_bruteforce(self, i):
         ai = self.agents[i]
         res=[]
+        r2 = self.r_neigh*self.r_neigh
         for j,aj in enumerate(self.agents):
             if i==j: continue
             if self.reflective:
@@ -139,7 +485,7 @@ class MultiAgentSim:
             else:
                 dx = torus_delta(ai.x, aj.x, self.W); dy = torus_delta(ai.y, aj.y, self.H)
             d2 = dx*dx + dy*dy
-            if d2 <= self.r_neigh*self.r_neigh:
+            if d2 <= r2:
                 res.append((j, dx, dy, math.sqrt(d2)))
         return res
 
@@ -149,23 +495,69 @@ class MultiAgentSim:
         else:
             return self.neighbors_bruteforce(i)
 
+    def leader_dir_of(self, i):
+        return self.leader_dirs[self.leader_ids.index(i) % len(self.leader_dirs)]
+
     def step(self):
-        new_accs = []
+        # prepare -> compute -> integrate; each phase's time is added to phase_times
+        if self.backend == 'numpy':
+            phases = (self._prepare_numpy, self._compute_numpy, self._integrate_numpy)
+        elif self.backend == 'parallel':
+            phases = (self._prepare_parallel, self._compute_parallel, self._integrate_parallel)
+        else:
+            phases = (self._prepare, self._compute, self._integrate)
+        data, times = None, {}
+        for name, phase in zip(self.PHASES, phases):
+            t0 = time.perf_counter()
+            data = phase(data)
+            times[name] = time.perf_counter() - t0
+            self.phase_times[name] += times[name]
+        self.t += 1
+        if self.profile_hook is not None:
+            self.profile_hook(self.t, times)
+
+    def phase_report(self):
+        # mean ms/step for each phase
+        return {name: 1000 * total / max(1, self.t) for name, total in self.phase_times.items()}
+
+    def _prepare(self, _):
+        # what stays fixed during a step: the cell list and the leader table
         cells = self.build_cell_list() if self.use_cell_list else None
+        leaders = [(self.agents[i].x, self.agents[i].y, self.agents[i].vel()) for i in self.leader_ids]
+        return cells, leaders
+
+    def _nearest_leader_vel(self, ai, leaders):
+        if len(leaders) == 1:
+            return leaders[0][2]
+        best, best_v = None, None
+        for lx, ly, lv in leaders:
+            if self.reflective:
+                dx = lx - ai.x; dy = ly - ai.y
+            else:
+                dx = torus_delta(ai.x, lx, self.W); dy = torus_delta(ai.y, ly, self.H)
+            d2 = dx*dx + dy*dy
+            if best is None or d2 < best:
+                best, best_v = d2, lv
+        return best_v
+
+    def _compute(self, prepared):
+        cells, leaders = prepared
+        new_accs = []
+        noise, sep_dist = self.noise, self.sep_dist
 
         # compute accelerations
         for i in range(self.N):
             ai = self.agents[i]
             if ai.is_leader:
                 # leader keeps direction
-                desired_v = mul(self.leader_dir, self.v_max)
+                desired_v = mul(self.leader_dir_of(i), self.v_max)
                 acc = sub(desired_v, ai.vel())
-                acc = add(acc, ((random.random()-0.5)*self.noise, (random.random()-0.5)*self.noise))
+                acc = add(acc, ((random.random()-0.5)*noise, (random.random()-0.5)*noise))
                 new_accs.append(acc); continue
 
             neigh = self.neighbors(i, cells)
             if not neigh:
-                jitter = ((random.random()-0.5)*self.noise, (random.random()-0.5)*self.noise)
+                jitter = ((random.random()-0.5)*noise, (random.random()-0.5)*noise)
                 new_accs.append(jitter); continue
 
             sep=(0.0,0.0); cx=0.0; cy=0.0; avx=0.0; avy=0.0; count=0
@@ -173,8 +565,8 @@ class MultiAgentSim:
                 count+=1
                 cx += dx; cy += dy
                 vj = self.agents[j].vel(); avx += vj[0]; avy += vj[1]
-                if d < self.sep_dist and d>1e-9:
-                    push = mul((dx/d, dy/d), - (self.sep_dist - d) / self.sep_dist)
+                if d < sep_dist and d>1e-9:
+                    push = mul((dx/d, dy/d), - (sep_dist - d) / sep_dist)
                     sep = add(sep, push)
 
             coh = (0.0,0.0); align=(0.0,0.0)
@@ -182,22 +574,20 @@ class MultiAgentSim:
                 coh = mul((-cx/count, -cy/count), 1.0)
                 align = sub((avx/count, avy/count), ai.vel())
 
-            # leader influence
-            if self.leader_enabled:
-                leader_v = None
-                for a in self.agents:
-                    if a.is_leader:
-                        leader_v = a.vel(); break
-                if leader_v is not None:
-                    align = add(align, mul(sub(leader_v, ai.vel()), self.leader_influence))
+            # leader influence: nearest leader (table built once in _prepare)
+            if self.leader_enabled and leaders:
+                leader_v = self._nearest_leader_vel(ai, leaders)
+                align = add(align, mul(sub(leader_v, ai.vel()), self.leader_influence))
 
             acc = (0.0,0.0)
             acc = add(acc, mul(sep, self.w_sep))
             acc = add(acc, mul(coh, self.w_coh))
             acc = add(acc, mul(align, self.w_align))
-            acc = add(acc, ((random.random()-0.5)*self.noise, (random.random()-0.5)*self.noise))
+            acc = add(acc, ((random.random()-0.5)*noise, (random.random()-0.5)*noise))
             new_accs.append(acc)
+        return new_accs
 
+    def _integrate(self, new_accs):
         # integrate
         for i,a in enumerate(new_accs):
             ag = self.agents[i]
@@ -220,7 +610,8 @@ class MultiAgentSim:
                 ag.energy -= self.energy_cost * speed * self.dt * 0.2
 
                 # energiya zaryad zonalari orqali tiklanadi
-                for zx, zy, zr, rate in self.recharge_zones:
+                # (only zones that reach this agent's cell)
+                for zx, zy, zr, rate in self.zone_index.near(nx, ny):
                     if self.reflective:
                         dx = nx - zx
                         dy = ny - zy
@@ -239,17 +630,138 @@ class MultiAgentSim:
                 vx *= energy_factor
                 vy *= energy_factor
 
-                # rangni energiyaga qarab o‘zgartiramiz (vizual sezilsin)
-                ag.color = f"#{int(255*(1-ag.energy)):02x}{int(255*ag.energy):02x}40"
-
             # pozitsiyani yangilaymiz
             ag.x, ag.y, ag.vx, ag.vy = nx, ny, vx, vy
 
-        self.t += 1
+    # ----------------- numpy backend -----------------
+    def _neighbor_sums(self, pos, vel, rows=None):
+        # CSR cell-list pairs in chunks: per agent the neighbour count,
+        # sum(dx, dy), sum(vx, vy) and the separation push; with rows, only
+        # for those agents (other columns stay zero)
+        N, sep_dist = len(pos), self.sep_dist
+        sums = np.zeros((7, N))  # count, dx, dy, vx, vy, sep_x, sep_y
+        for i, j, dx, dy, d2 in self.cell_list.iter_pairs(pos, rows=rows):
+            d = np.sqrt(d2)
+            close = (d < sep_dist) & (d > 1e-9)
+            push = np.zeros_like(d)
+            push[close] = -(sep_dist - d[close]) / sep_dist / d[close]
+            for row, w in enumerate((None, dx, dy, vel[j, 0], vel[j, 1], dx * push, dy * push)):
+                sums[row] += np.bincount(i, weights=w, minlength=N)
+        return sums
+
+    def _prepare_numpy(self, _):
+        jitter = (self.rng.random((self.N, 2)) - 0.5) * self.noise
+        return jitter
+
+    def _nearest_leader_vel_numpy(self, lpos, lvel, pos):
+        # (N, L) distances; L is usually small
+        if len(lpos) == 1:
+            return lvel[0]
+        d = lpos[None, :, :] - pos[:, None, :]
+        if not self.reflective:
+            size = np.array([self.W, self.H])
+            d -= size * (d > size / 2)
+            d += size * (d < -size / 2)
+        return lvel[np.argmin((d * d).sum(axis=2), axis=1)]
+
+    def _accelerations(self, sums, vel, pos, gid, jitter, lpos, lvel):
+        # sums/vel/pos -- the agents being computed, gid -- their global ids
+        count, sx, sy, svx, svy, sepx, sepy = sums
+        has = count > 0
+        inv = np.divide(1.0, count, out=np.zeros(len(count)), where=has)
+        coh = -np.stack([sx, sy], axis=1) * inv[:, None]
+        align = np.stack([svx, svy], axis=1) * inv[:, None] - vel
+        if self.leader_enabled and len(lpos):
+            align += (self._nearest_leader_vel_numpy(lpos, lvel, pos) - vel) * self.leader_influence
+        acc = (np.stack([sepx, sepy], axis=1) * self.w_sep + coh * self.w_coh
+               + align * self.w_align + jitter)
+        acc[~has] = jitter[~has]
+        lead = gid < len(self.leader_ids)  # leaders are the first agents
+        acc[lead] = self.leader_dir_table[gid[lead]] * self.v_max - vel[lead] + jitter[lead]
+        return acc
+
+    def _compute_numpy(self, jitter):
+        L = len(self.leader_ids)
+        return self._accelerations(self._neighbor_sums(self.pos, self.vel), self.vel, self.pos,
+                                   np.arange(self.N), jitter, self.pos[:L], self.vel[:L])
+
+    def _advance(self, pos, vel, energy, acc, leader):
+        # velocity/position/energy update, independently per agent
+        dt = self.dt
+        v = vel + acc * dt
+        n2 = (v * v).sum(axis=1)
+        over = n2 > self.v_max * self.v_max
+        v[over] *= (self.v_max / np.sqrt(n2[over]))[:, None]
+        p = pos + v * dt
+        if self.reflective:
+            for k, L in ((0, self.W), (1, self.H)):
+                low = p[:, k] < 0
+                p[low, k] = -p[low, k]; v[low, k] = -v[low, k]
+                high = p[:, k] >= L
+                p[high, k] = 2 * L - p[high, k]; v[high, k] = -v[high, k]
+                np.clip(p[:, k], 0.0, L, out=p[:, k])
+        else:
+            for k, L in ((0, self.W), (1, self.H)):
+                p[:, k] %= L
+                p[p[:, k] >= L, k] -= L
+
+        if self.energy_model:
+            mob = ~leader
+            speed = np.hypot(v[:, 0], v[:, 1])
+            e = energy - self.energy_cost * speed * dt * 0.2
+            e += self.zone_index.recharge(p, dt)
+            e = np.clip(e, 0.0, 1.0)
+            energy = np.where(mob, e, energy)
+            v[mob] *= (0.5 + 1.5 * energy[mob] ** 0.6)[:, None]
+        return p, v, energy
+
+    def _integrate_numpy(self, acc):
+        self.pos, self.vel, self.energy = self._advance(self.pos, self.vel, self.energy, acc, self.leader)
+
+    def _strip_update(self, loc, rows, ids, src, t):
+        # one strip: loc -- strip + halo agents (x, y, vx, vy, energy) in global order,
+        # rows -- the strip itself within them; returns the new state of those agents
+        pos, vel = loc[:, 0:2], loc[:, 2:4]
+        gid = ids[rows]
+        L = len(self.leader_ids)
+        jitter = (counter_uniform(self.seed or 0, t, gid) - 0.5) * self.noise
+        sums = self._neighbor_sums(pos, vel, rows)[:, rows]
+        acc = self._accelerations(sums, vel[rows], pos[rows], gid, jitter, src[:L, 0:2], src[:L, 2:4])
+        p, v, e = self._advance(pos[rows], vel[rows], loc[rows, 4], acc, gid < L)
+        return np.column_stack([p, v, e])
+
+    def _prepare_parallel(self, _):
+        strips = 1 if self._pool is None else self.workers
+        return [(k, self.t, self._cur) for k in range(strips)]
+
+    def _compute_parallel(self, jobs):
+        if self._pool is None:
+            for job in jobs:
+                _strip_step(job, self._strip_ctx)
+        else:
+            self._pool.map(_strip_step, jobs, chunksize=1)
+
+    def _integrate_parallel(self, _):
+        self._cur = 1 - self._cur
+        self._use_buffer(self._cur)
 
     # metrics
+    def state_arrays(self):
+        if self.vectorized:
+            return self.pos, self.vel
+        return (np.array([a.pos() for a in self.agents], dtype=float).reshape(-1, 2),
+                np.array([a.vel() for a in self.agents], dtype=float).reshape(-1, 2))
+
+    def metrics(self):
+        # (polarization, mean_speed, mean_nn_distance) in one pass
+        pos, vel = self.state_arrays()
+        return flock_metrics(pos, vel, self.W, self.H, not self.reflective)
+
     def polarization(self):
         if self.N==0: return 0.0
+        if self.vectorized:
+            spd_sum = np.hypot(self.vel[:, 0], self.vel[:, 1]).sum()
+            return 0.0 if spd_sum < 1e-12 else float(np.hypot(*self.vel.sum(axis=0)) / spd_sum)
         v_sum=(0.0,0.0); spd_sum=0.0
         for a in self.agents:
             v_sum = add(v_sum, a.vel())
@@ -259,28 +771,179 @@ class MultiAgentSim:
 
     def mean_speed(self):
         if self.N==0: return 0.0
+        if self.vectorized:
+            return float(np.hypot(self.vel[:, 0], self.vel[:, 1]).mean())
         return sum(math.hypot(a.vx,a.vy) for a in self.agents) / self.N
 
     def mean_nn_distance(self):
         if self.N<=1: return 0.0
-        total=0.0
-        for i in range(self.N):
-            ai = self.agents[i]
-            best=1e9
-            for j in range(self.N):
-                if i==j: continue
-                if self.reflective:
-                    dx = self.agents[j].x - ai.x; dy = self.agents[j].y - ai.y
-                else:
-                    dx = torus_delta(ai.x, self.agents[j].x, self.W); dy = torus_delta(ai.y, self.agents[j].y, self.H)
-                d = math.hypot(dx,dy)
-                if d < best: best=d
-            total += best
-        return total / self.N
+        pos, _ = self.state_arrays()
+        return float(nn_distances(pos, self.W, self.H, not self.reflective).mean())
+
+# ----------------- recording / replay -----------------
+# File: MAGIC, frame count (uint64), JSON header length (uint64), JSON header
+# (N, W, H, dt, every, t0, params), then 64-byte aligned: types int8[N],
+# leader uint8[N] and frames float32[frames, N, 5] -- (x, y, vx, vy, energy)
+REC_MAGIC = b"BOIDREC1"
+REC_FIELDS = ('x', 'y', 'vx', 'vy', 'energy')
+REC_PARAMS = ('v_max', 'r_neigh', 'w_sep', 'w_coh', 'w_align', 'sep_dist', 'noise', 'leader_enabled',
+              'leader_dirs', 'leader_influence', 'reflective', 'energy_model', 'energy_cost',
+              'recharge_zones', 'backend', 'seed')
+
+def _align64(n):
+    return (n + 63) // 64 * 64
+
+class TrajectoryRecorder:
+    # every `every` steps the state is written as a float32 frame; the file grows
+    # in chunks of chunk_frames frames that are filled through a memmap
+    def __init__(self, path, sim, every=1, chunk_frames=64):
+        self.path, self.sim, self.every = path, sim, max(1, every)
+        self.N, self.t0 = sim.N, sim.t
+        self.frame_bytes = self.N * len(REC_FIELDS) * 4
+        self.chunk_frames = max(1, chunk_frames)
+        header = dict(N=sim.N, W=sim.W, H=sim.H, dt=sim.dt, every=self.every, t0=sim.t, fields=REC_FIELDS,
+                      params={k: getattr(sim, k) for k in REC_PARAMS})
+        blob = json.dumps(header).encode()
+        if sim.vectorized:
+            types, leader = sim.types, sim.leader
+        else:
+            types = np.array([TYPES.index(a.type) for a in sim.agents], dtype=np.int8)
+            leader = np.array([a.is_leader for a in sim.agents], dtype=bool)
+        meta = _align64(len(REC_MAGIC) + 16 + len(blob))
+        self.data_offset = meta + _align64(2 * self.N)
+        with open(path, "wb") as f:
+            f.write(REC_MAGIC + struct.pack("<QQ", 0, len(blob)) + blob)
+            f.seek(meta)
+            f.write(types.astype(np.int8).tobytes() + leader.astype(np.uint8).tobytes())
+            f.truncate(self.data_offset)
+        self.frames = 0
+        self._chunk, self._chunk_start = None, 0
+
+    def _map_chunk(self):
+        # next chunk: grow the file and map only that chunk
+        self._flush_chunk()
+        self._chunk_start = self.frames
+        with open(self.path, "r+b") as f:
+            f.truncate(self.data_offset + (self.frames + self.chunk_frames) * self.frame_bytes)
+        self._chunk = np.memmap(self.path, dtype=np.float32, mode="r+",
+                                offset=self.data_offset + self.frames * self.frame_bytes,
+                                shape=(self.chunk_frames, self.N, len(REC_FIELDS)))
+
+    def _flush_chunk(self):
+        if self._chunk is not None:
+            self._chunk.flush()
+            self._chunk = None
+            with open(self.path, "r+b") as f:
+                f.seek(len(REC_MAGIC))
+                f.write(struct.pack("<Q", self.frames))
+
+    def record(self):
+        # called after every step(); frame k is step t0 + k * every
+        sim = self.sim
+        if (sim.t - self.t0) % self.every:
+            return False
+        if self._chunk is None or self.frames - self._chunk_start >= self.chunk_frames:
+            self._map_chunk()
+        frame = self._chunk[self.frames - self._chunk_start]
+        if sim.vectorized:
+            frame[:, 0:2] = sim.pos
+            frame[:, 2:4] = sim.vel
+            frame[:, 4] = sim.energy
+        else:
+            frame[:] = [(a.x, a.y, a.vx, a.vy, a.energy) for a in sim.agents]
+        self.frames += 1
+        return True
+
+    def close(self):
+        # flush the last chunk and truncate the file to the exact frame count
+        if self.sim is None:
+            return
+        self._flush_chunk()
+        with open(self.path, "r+b") as f:
+            f.truncate(self.data_offset + self.frames * self.frame_bytes)
+        self.sim = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class TrajectoryReplay:
+    # reads a recording without re-simulating; offers the simulation interface
+    # (agents, t, step, metrics) to the GUI and MetricsCollector -- step advances one frame
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if f.read(len(REC_MAGIC)) != REC_MAGIC:
+                raise ValueError(f"{path}: not a boids recording")
+            frames, blob_len = struct.unpack("<QQ", f.read(16))
+            header = json.loads(f.read(blob_len))
+            N = header["N"]
+            meta = _align64(len(REC_MAGIC) + 16 + blob_len)
+            f.seek(meta)
+            extra = np.frombuffer(f.read(2 * N), dtype=np.uint8)
+            size = os.fstat(f.fileno()).st_size
+        self.header, self.params = header, header["params"]
+        self.N, self.W, self.H, self.dt = N, header["W"], header["H"], header["dt"]
+        self.every, self.t0 = header["every"], header["t0"]
+        self.types = extra[:N].astype(np.int8)
+        self.leader = extra[N:].astype(bool)
+        data_offset = meta + _align64(2 * N)
+        frame_bytes = N * len(REC_FIELDS) * 4
+        frames = min(frames, (size - data_offset) // frame_bytes) if frame_bytes else frames
+        self.frames = (np.memmap(path, dtype=np.float32, mode="r", offset=data_offset,
+                                 shape=(frames, N, len(REC_FIELDS)))
+                       if frames else np.zeros((0, N, len(REC_FIELDS)), dtype=np.float32))
+        self.reflective = self.params["reflective"]
+        self.energy_model = self.params["energy_model"]
+        self.leader_enabled = self.params["leader_enabled"]
+        self.recharge_zones = [tuple(z) for z in self.params["recharge_zones"]]
+        self.vectorized = True
+        self.agents = [AgentView(self, i) for i in range(N)]
+        self.seek(0)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def seek(self, k):
+        self.index = k
+        frame = self.frames[k] if len(self.frames) else np.zeros((self.N, len(REC_FIELDS)), dtype=np.float32)
+        self.pos, self.vel, self.energy = frame[:, 0:2], frame[:, 2:4], frame[:, 4]
+        self.t = self.t0 + k * self.every
+
+    def step(self):
+        # stops at the last frame
+        if self.index + 1 < len(self.frames):
+            self.seek(self.index + 1)
+
+    def state_arrays(self):
+        return self.pos, self.vel
+
+    def metrics(self):
+        return flock_metrics(self.pos, self.vel, self.W, self.H, not self.reflective)
+
+    def iter_metrics(self, start=0, stop=None, stride=1, fn=None):
+        # (t, *fn(pos, vel)) per frame; flock_metrics when fn is None
+        fn = fn or (lambda pos, vel: flock_metrics(pos, vel, self.W, self.H, not self.reflective))
+        for k in range(start, len(self.frames) if stop is None else stop, stride):
+            frame = self.frames[k]
+            yield (self.t0 + k * self.every, *fn(frame[:, 0:2], frame[:, 2:4]))
 
 # ----------------- GUI -----------------
+def blend(hexc, f):
+    # blend a colour with white (f=1: original, f=0: white)
+    hexc = hexc.lstrip('#')
+    rint, gint, bint = int(hexc[0:2],16), int(hexc[2:4],16), int(hexc[4:6],16)
+    r2 = int(255 + (rint-255)*f)
+    g2 = int(255 + (gint-255)*f)
+    b2 = int(255 + (bint-255)*f)
+    return f"#{r2:02x}{g2:02x}{b2:02x}"
+
 class MiniBoidsGUI:
     COLORS = {'A':'#4E79A7', 'B':'#E15759', 'C':'#59A14F', 'L':'#F28E2B'}
+    FRAME_MS = 33            # never redraw faster than ~30 FPS
+    STEP_HZ = 1000 / 60      # 1x speed = one step every 60 ms, as before
+    METRICS_EVERY = 4        # metrics every 4 steps (~4 times a second at 1x)
     def __init__(self, root):
         self.root = root
         root.title("Mini-Boids — Minimal GUI")
@@ -301,6 +964,7 @@ class MiniBoidsGUI:
         self.canvas.pack(expand=True, padx=8, pady=8)
 
         # create initial sim (⚠️ FULL SIZE, not half)
+        self.zones = [(self.CANVAS_W/2, self.CANVAS_H/2, 40, 0.05)]
         self.sim = MultiAgentSim(W=self.CANVAS_W, H=self.CANVAS_H, N=80,
                                  r_neigh=12.0, v_max=2.2,
                                  w_sep=1.2, w_coh=0.8, w_align=0.9,
@@ -308,12 +972,15 @@ class MiniBoidsGUI:
                                  leader=True, leader_dir=(1,0), leader_influence=0.6,
                                  reflective=False, use_cell_list=True,
                                  energy_model=False,
-                                 recharge_zones=[(self.CANVAS_W/2, self.CANVAS_H/2, 40, 0.05)])
+                                 recharge_zones=self.zones)
+        self.metrics = MetricsCollector(self.sim, every=self.METRICS_EVERY)
 
         self.build_controls()
         self.running = False
         self.after_id = None
+        self.recorder = None
         self.speed_scale.set(1.0)
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.draw_once()
 
 
@@ -337,6 +1004,15 @@ class MiniBoidsGUI:
                               relief="ridge", padx=8, pady=6)
         reset_btn.pack(fill="x", **pad)
 
+        # record / replay
+        rec_frame = tk.Frame(self.ctrl_frame, bg="#FFFFFF")
+        rec_frame.pack(fill="x", **pad)
+        self.record_btn = tk.Button(rec_frame, text="Record", command=self.toggle_record, bg="#FFFFFF",
+                                    fg="#333333", relief="ridge", padx=8, pady=4)
+        self.record_btn.pack(side="left", expand=True, fill="x", padx=(0,4))
+        tk.Button(rec_frame, text="Open recording…", command=self.open_recording, bg="#FFFFFF", fg="#333333",
+                  relief="ridge", padx=8, pady=4).pack(side="left", expand=True, fill="x", padx=(4,0))
+
         # Parameter sliders
         lbl = tk.Label(self.ctrl_frame, text="Parameters", bg="#FFFFFF", fg="#333333", font=("Segoe UI", 10, "bold"))
         lbl.pack(pady=(12,4))
@@ -367,6 +1043,8 @@ class MiniBoidsGUI:
         tk.Checkbutton(tframe, text="Leader", variable=self.leader_var, bg="#FFFFFF", anchor="w").pack(anchor="w")
         tk.Checkbutton(tframe, text="Reflective walls", variable=self.reflect_var, bg="#FFFFFF", anchor="w").pack(anchor="w")
         tk.Checkbutton(tframe, text="Energy model", variable=self.energy_var, bg="#FFFFFF", anchor="w").pack(anchor="w")
+        tk.Button(tframe, text="Load zones…", command=self.load_zones, bg="#FFFFFF", fg="#333333",
+                  relief="ridge").pack(fill="x", pady=(4, 0))
 
         # metrics
         sep = ttk.Separator(self.ctrl_frame, orient="horizontal")
@@ -386,6 +1064,7 @@ class MiniBoidsGUI:
 
     def reset(self):
         # apply sliders/toggles to sim and re-create (⚠️ FULL SIZE)
+        self.stop_recording()
         W, H = self.CANVAS_W, self.CANVAS_H
         N = 80
         self.sim = MultiAgentSim(W=W, H=H, N=N,
@@ -396,12 +1075,64 @@ class MiniBoidsGUI:
                                  leader=self.leader_var.get(), leader_dir=(1,0), leader_influence=0.6,
                                  reflective=self.reflect_var.get(), use_cell_list=True,
                                  energy_model=self.energy_var.get(),
-                                 recharge_zones=[(W/2, H/2, 40, 0.05)])
+                                 recharge_zones=self.zones)
+        self.metrics = MetricsCollector(self.sim, every=self.METRICS_EVERY)
+        self.draw_once()
+
+    def load_zones(self):
+        # recharge zones from a CSV (x,y,r,rate); later Resets keep using them
+        path = filedialog.askopenfilename(filetypes=[("CSV", "*.csv"), ("All files", "*.*")])
+        if not path: return
+        try:
+            self.zones = load_zones(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Zones", str(e)); return
+        if isinstance(self.sim, MultiAgentSim):
+            self.sim.set_recharge_zones(self.zones)
         self.draw_once()
 
+    def toggle_record(self):
+        # record the current simulation to a file (every step); press again to stop
+        if self.recorder is not None:
+            self.stop_recording(); return
+        if not isinstance(self.sim, MultiAgentSim): return
+        path = filedialog.asksaveasfilename(defaultextension=".boids",
+                                            filetypes=[("Boids recording", "*.boids"), ("All files", "*.*")])
+        if not path: return
+        self.recorder = TrajectoryRecorder(path, self.sim)
+        self.recorder.record()
+        self.record_btn.config(text="Stop recording")
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+            self.record_btn.config(text="Record")
+
+    def open_recording(self):
+        # replay a recording: Start/Pause play frames, Reset returns to the live model
+        path = filedialog.askopenfilename(filetypes=[("Boids recording", "*.boids"), ("All files", "*.*")])
+        if not path: return
+        try:
+            replay = TrajectoryReplay(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Recording", str(e)); return
+        self.pause()
+        self.stop_recording()
+        self.sim = replay
+        self.metrics = MetricsCollector(self.sim, every=self.METRICS_EVERY)
+        self.draw_once()
+
+    def on_close(self):
+        self.pause()
+        self.stop_recording()
+        self.root.destroy()
+
     def start(self):
         if self.running: return
         self.running = True
+        self._credit = 1.0
+        self._last_tick = time.perf_counter()
         self.run_loop()
 
     def pause(self):
@@ -410,21 +1141,35 @@ class MiniBoidsGUI:
             self.root.after_cancel(self.after_id); self.after_id = None
 
     def run_loop(self):
-        # step sim several times depending on speed multiplier
-        speed = self.speed_scale.get()
-        steps = max(1, int(speed))
+        # the step count follows the speed setting, frames follow FRAME_MS;
+        # when the model is slow at most FRAME_MS of stepping is spent per frame
+        now = time.perf_counter()
+        rate = self.speed_scale.get() * self.STEP_HZ
+        self._credit = min(self._credit + rate * (now - self._last_tick), max(1.0, rate * self.FRAME_MS / 250))
+        self._last_tick = now
+        steps = int(self._credit)
+        self._credit -= steps
+        deadline = now + self.FRAME_MS / 1000
         for _ in range(steps):
             self.sim.step()
-        self.draw_once()
-        # update metrics
-        pol = self.sim.polarization(); ms = self.sim.mean_speed(); mnn = self.sim.mean_nn_distance()
-        self.pol_label.config(text=f"Polarization: {pol:0.3f}")
-        self.ms_label.config(text=f"Mean speed: {ms:0.3f}")
-        self.nn_label.config(text=f"Mean NN dist: {mnn:0.2f}")
+            if self.recorder is not None:
+                self.recorder.record()
+            if time.perf_counter() > deadline:
+                self._credit = 0.0; break
+        if steps:
+            self.update_scene()
+        sample = self.metrics.maybe_sample() if steps else None
+        if sample:
+            _, pol, ms, mnn = sample
+            self.pol_label.config(text=f"Polarization: {pol:0.3f}")
+            self.ms_label.config(text=f"Mean speed: {ms:0.3f}")
+            self.nn_label.config(text=f"Mean NN dist: {mnn:0.2f}")
         if self.running:
-            self.after_id = self.root.after(60, self.run_loop)  # ~16 FPS
+            self.after_id = self.root.after(self.FRAME_MS, self.run_loop)
 
     def draw_once(self):
+        # rebuild the scene: items are created once per agent, and later frames
+        # only change coordinates/colour/text in update_scene
         self.canvas.delete("all")
 
         # Energiya zonalarini chizish
@@ -434,41 +1179,75 @@ class MiniBoidsGUI:
             self.canvas.create_oval(zx-6, zy-6, zx+6, zy+6,
                                     fill="#93D977", outline="")
 
-        # Agentlarni chizish
+        # Agents: body, heading line, leader ring, energy text
+        self.items = []
         for a in self.sim.agents:
-            sx, sy = a.x, a.y
-            r = 4
             color = self.COLORS.get('L' if a.is_leader else a.type, "#444444")
+            body = self.canvas.create_oval(0, 0, 0, 0, fill=color, outline="")
+            head = self.canvas.create_line(0, 0, 0, 0, fill="#222222", width=1)
+            ring = self.canvas.create_oval(0, 0, 0, 0, outline="#F28E2B", width=2) if a.is_leader else None
+            text = (self.canvas.create_text(0, 0, text="", fill="#333333", font=("Segoe UI", 8, "bold"))
+                    if self.sim.energy_model else None)
+            self.items.append([body, head, ring, text, color, None])
+        self.update_scene()
 
-            if self.sim.energy_model:
-                fade = 0.4 + 0.6 * a.energy
-                def blend(hexc, f):
-                    hexc = hexc.lstrip('#')
-                    rint, gint, bint = int(hexc[0:2],16), int(hexc[2:4],16), int(hexc[4:6],16)
-                    r2 = int(255 + (rint-255)*f)
-                    g2 = int(255 + (gint-255)*f)
-                    b2 = int(255 + (bint-255)*f)
-                    return f"#{r2:02x}{g2:02x}{b2:02x}"
-                color = blend(color, fade)
-
-            self.canvas.create_oval(sx-r, sy-r, sx+r, sy+r, fill=color, outline="")
-
+    def update_scene(self):
+        coords, itemconfig = self.canvas.coords, self.canvas.itemconfig
+        energy = self.sim.energy_model
+        for a, item in zip(self.sim.agents, self.items):
+            body, head, ring, text, color, shown = item
+            sx, sy = a.x, a.y
+            r = 4
+            coords(body, sx-r, sy-r, sx+r, sy+r)
             # Harakat yo‘nalishi
-            hx = sx + a.vx*3
-            hy = sy + a.vy*3
-            self.canvas.create_line(sx, sy, hx, hy, fill="#222222", width=1)
-
+            coords(head, sx, sy, sx + a.vx*3, sy + a.vy*3)
             # Lider belgisi
-            if a.is_leader:
-                self.canvas.create_oval(sx-7, sy-7, sx+7, sy+7, outline="#F28E2B", width=2)
+            if ring is not None:
+                coords(ring, sx-7, sy-7, sx+7, sy+7)
+            # colour and text update only when energy changes
+            if energy:
+                coords(text, sx, sy - 10)
+                if a.energy != shown:
+                    item[5] = a.energy
+                    itemconfig(body, fill=blend(color, 0.4 + 0.6 * a.energy))
+                    itemconfig(text, text=f"{a.energy:.2f}")
 
-            # Energiya qiymatini agent tepasiga yozamiz
-            if self.sim.energy_model:
-                energy_text = f"{a.energy:.2f}"
-                self.canvas.create_text(sx, sy - 10, text=energy_text,
-                                        fill="#333333", font=("Segoe UI", 8, "bold"))
+def run_headless(argv=None):
+    # large swarms without the GUI: python lesson-8/main.py --steps 100 --agents 1000000 --workers 32
+    import argparse
+    ap = argparse.ArgumentParser(description="Run the boids model without the GUI (backend='parallel').")
+    ap.add_argument("--steps", type=int, required=True)
+    ap.add_argument("--agents", type=int, default=100000)
+    ap.add_argument("--size", type=float, default=3000.0, help="torus side length")
+    ap.add_argument("--radius", type=float, default=12.0)
+    ap.add_argument("--workers", type=int, default=mp.cpu_count())
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--record", metavar="PATH", help="save frames for TrajectoryReplay")
+    ap.add_argument("--record-every", type=int, default=1)
+    args = ap.parse_args(argv)
+    sim = MultiAgentSim(W=args.size, H=args.size, N=args.agents, r_neigh=args.radius, seed=args.seed,
+                        backend='parallel', workers=args.workers)
+    recorder = TrajectoryRecorder(args.record, sim, every=args.record_every) if args.record else None
+    try:
+        t0 = time.perf_counter()
+        if recorder: recorder.record()
+        for _ in range(args.steps):
+            sim.step()
+            if recorder: recorder.record()
+        elapsed = time.perf_counter() - t0
+        pol, ms, nn = sim.metrics()
+        print(f"{args.steps} steps x {args.agents} agents in {elapsed:.2f}s ({args.steps / elapsed:.2f} steps/s, "
+              f"workers={args.workers}); ms/step: " + ", ".join(f"{k} {v:.1f}" for k, v in sim.phase_report().items()))
+        print(f"polarization {pol:.3f}, mean speed {ms:.3f}, mean NN dist {nn:.2f}")
+    finally:
+        if recorder: recorder.close()
+        sim.close()
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = MiniBoidsGUI(root)
-    root.mainloop()
+    import sys
+    if len(sys.argv) > 1:
+        run_headless()
+    else:
+        root = tk.Tk()
+        app = MiniBoidsGUI(root)
+        root.mainloop()
@@ -0,0 +1,84 @@
+# Cell list vs brute force: python lesson-8/test_cell_list.py (or pytest lesson-8)
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from main import CellList, MultiAgentSim
+
+# (W, H, r): 100x100 with r=12 does not divide evenly (8 cells of 12.5),
+# 30 and 20 give nx=2 and nx=1, where wrapped neighbours repeat a cell
+DOMAINS = [(100.0, 100.0, 12.0), (30.0, 100.0, 12.0), (20.0, 20.0, 12.0), (160.0, 100.0, 12.0)]
+
+
+def make_sim(W, H, r, reflective, N=300, seed=3):
+    sim = MultiAgentSim(W=W, H=H, N=N, seed=seed, r_neigh=r, reflective=reflective)
+    # agents on the domain edges and cell borders, where off-by-one cell lookups show up
+    edges = [(0.0, 0.0), (W - 1e-9, H - 1e-9), (0.0, H / 2), (W / 2, 0.0),
+             (sim.cell_list.cw, sim.cell_list.ch), (W - sim.cell_list.cw, H / 3)]
+    for a, (x, y) in zip(sim.agents, edges):
+        a.x, a.y = x, y
+    return sim
+
+
+def as_set(found):
+    return {(j, round(dx, 9), round(dy, 9)) for j, dx, dy, *_ in found}
+
+
+def check_neighbors_cell(W, H, r, reflective):
+    sim = make_sim(W, H, r, reflective)
+    cells = sim.build_cell_list()
+    for i in range(sim.N):
+        got = sim.neighbors_cell(i, cells)
+        assert len(got) == len({j for j, *_ in got}), (W, H, i, "duplicate neighbour")
+        assert as_set(got) == as_set(sim.neighbors_bruteforce(i)), (W, H, reflective, i)
+
+
+def check_pairs(W, H, r, reflective):
+    sim = make_sim(W, H, r, reflective)
+    pos = np.array([a.pos() for a in sim.agents])
+    i, j, dx, dy, d2 = CellList(W, H, r, periodic=not reflective).pairs(pos)
+    assert np.allclose(dx * dx + dy * dy, d2)
+    got = {}
+    for a, b, x, y in zip(i.tolist(), j.tolist(), dx.tolist(), dy.tolist()):
+        got.setdefault(a, set()).add((b, round(x, 9), round(y, 9)))
+    assert len(i) == sum(len(s) for s in got.values()), (W, H, "duplicate pair")
+    for a in range(sim.N):
+        assert got.get(a, set()) == as_set(sim.neighbors_bruteforce(a)), (W, H, reflective, a)
+
+
+def test_neighbors_cell_periodic():
+    for W, H, r in DOMAINS:
+        check_neighbors_cell(W, H, r, reflective=False)
+
+
+def test_neighbors_cell_reflective():
+    for W, H, r in DOMAINS:
+        check_neighbors_cell(W, H, r, reflective=True)
+
+
+def test_pairs_periodic():
+    for W, H, r in DOMAINS:
+        check_pairs(W, H, r, reflective=False)
+
+
+def test_pairs_reflective():
+    for W, H, r in DOMAINS:
+        check_pairs(W, H, r, reflective=True)
+
+
+def test_small_grid_has_no_repeated_cells():
+    for W, H, r in DOMAINS:
+        cl = CellList(W, H, r)
+        assert cl.nx * cl.cw == W and cl.ny * cl.ch == H
+        assert cl.cw >= r and cl.ch >= r
+        for cells in cl.neighbors:
+            assert len(cells) == len(set(cells)) == min(cl.nx, 3) * min(cl.ny, 3)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(name, "ok")
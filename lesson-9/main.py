@@ -6,7 +6,11 @@ from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+from ga import GeneticAlgorithm
 
+
+# Scalar GA, kept as the reference for ga.py: the GUI runs the vectorized
+# GeneticAlgorithm, which follows the same fitness, selection, crossover and mutation rules.
 def fitness(x):
     return x * math.sin(10 * math.pi * x) + 1.0
 
@@ -121,7 +125,8 @@ class GeneticGUI(ttk.Window):
 
     # ---------- Core Algorithm ----------
     def _run_algorithm(self):
-        pop = init_population(self.pop_size)
+        # population in a NumPy array: every individual is evaluated once per generation
+        ga = GeneticAlgorithm(self.pop_size, cross_rate=self.cross_rate, mut_rate=self.mut_rate)
         best_history = []
 
         for g in range(self.generations):
@@ -129,17 +134,7 @@ class GeneticGUI(ttk.Window):
                 self._log(f"\n❌ To‘xtatildi {g}-avlodda.\n")
                 return
 
-            new_pop = []
-            for _ in range(self.pop_size):
-                p1 = selection(pop)
-                p2 = selection(pop)
-                child = crossover(p1, p2, rate=self.cross_rate)
-                child = mutate(child, rate=self.mut_rate)
-                new_pop.append(child)
-
-            pop = new_pop
-            best = max(pop, key=fitness)
-            fit = fitness(best)
+            best, fit = ga.step()
             best_history.append(fit)
 
             self._log(f"Avlod {g+1:02d}: Best x={best:.4f}, Fit={fit:.4f}")
@@ -147,8 +142,9 @@ class GeneticGUI(ttk.Window):
             self._update_chart(best_history)
             time.sleep(0.05)
 
-        best_overall = max(pop, key=fitness)
-        self.result_lbl.config(text=f"✅ Yakuniy natija:\nEng yaxshi x = {best_overall:.4f}\nFitnes = {fitness(best_overall):.4f}")
+        best_overall, fit = ga.best()
+        self.result_lbl.config(text=f"✅ Yakuniy natija:\nEng yaxshi x = {best_overall:.4f}\nFitnes = {fit:.4f}\n"
+                                    f"{ga.evals_per_sec():,.0f} baholash/s")
         self.start_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
 